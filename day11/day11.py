@@ -5,7 +5,9 @@
 from typing import Sequence, Any
 from pathlib import Path
 from collections import defaultdict
+import numpy as np
 from location import Location, Delta
+from digitgrid import load_digit_grid, ZERO
 
 INPUTFILE = "input.txt"
 
@@ -116,6 +118,42 @@ def iterate(energies) -> tuple[EnergyGrid, int]:
             final[loc] = energy
     return final, len(flashed)
 
+def iterate_array(energies: np.ndarray) -> int:
+    """Run one step on an array of energy levels, in place, and return
+    the number of octopuses that flashed.
+    """
+    energies += 1
+    flashed = np.zeros(energies.shape, dtype=bool)
+    flashing = energies > 9
+    while flashing.any():
+        flashed |= flashing
+        padded = np.pad(flashing, 1).astype(np.int8)
+        energies += (
+            padded[:-2, :-2] + padded[:-2, 1:-1] + padded[:-2, 2:] +
+            padded[1:-1, :-2] + padded[1:-1, 2:] +
+            padded[2:, :-2] + padded[2:, 1:-1] + padded[2:, 2:]
+        )
+        flashing = (energies > 9) & ~flashed
+    energies[flashed] = 0
+    return int(flashed.sum())
+
+def solve_file(path: str, steps: int = 100) -> tuple[int, int]:
+    """Solve both parts for the energy levels in the given file, loaded with
+    load_digit_grid() rather than parsed line by line.  Return the flashes
+    after the given number of steps, and the first step where all flash.
+    """
+    energies = np.subtract(load_digit_grid(path).chars, ZERO, dtype=np.int32)
+    total_flashes = 0
+    all_flash_step = 0
+    step = 0
+    while step < steps or not all_flash_step:
+        step += 1
+        flashes = iterate_array(energies)
+        if step <= steps:
+            total_flashes += flashes
+        if flashes == energies.size and not all_flash_step:
+            all_flash_step = step
+    return total_flashes, all_flash_step
 
 def solve2(lines: Lines) -> int:
     """Solve the problem."""
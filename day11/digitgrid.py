@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#
+from dataclasses import dataclass
+import mmap
+
+import numpy as np
+
+
+ZERO = ord("0")
+
+
+@dataclass
+class DigitGrid:
+    """A DigitGrid instance represents a rectangular grid of single digits,
+    loaded from a text file with one row of digits per line.
+    chars ..... (rows, cols) array of the ASCII codes of the digits.  This is a
+                read-only strided view of the memory-mapped file, so nothing
+                is copied: the newlines are skipped over, and ZERO is
+                subtracted wherever the digit values are used.
+    stride .... The number of bytes per line in the file, including the newline.
+    buf ....... The memory-mapped file.
+    """
+    rows: int
+    cols: int
+    stride: int
+    chars: np.ndarray
+    buf: mmap.mmap
+
+    def flat(self) -> "FlatDigits":
+        """Return a view of the digit values, indexed by r*cols + c."""
+        return FlatDigits(self)
+
+
+class FlatDigits:
+    """A FlatDigits instance is a read-only view of the digit values of a
+    DigitGrid, indexed by r*cols + c like a flat bytearray of digits.  Each
+    value is read from the mapped file and converted on demand.
+    """
+
+    def __init__(self, grid: DigitGrid):
+        self.grid = grid
+        self._buf = grid.buf
+        self._cols = grid.cols
+        self._pad = grid.stride - grid.cols
+
+    def __len__(self) -> int:
+        return self.grid.rows * self._cols
+
+    def __getitem__(self, idx: int) -> int:
+        return self._buf[idx + (idx // self._cols) * self._pad] - ZERO
+
+    def __iter__(self):
+        for row in self.grid.chars:
+            for char in row:
+                yield int(char) - ZERO
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return (self.grid.chars - ZERO).reshape(-1).astype(dtype or np.uint8, copy=False)
+
+
+def grid_shape(buf) -> tuple[int, int, int]:
+    """Return the rows, columns and line stride of the digit grid in the
+    given buffer.  Lines may end with "\n" or "\r\n", and the stride is
+    found from the first line ending.  The last line may or may not end
+    with a newline, and trailing blank lines are ignored.
+    Raises ValueError if the lines are not all the same length.
+    """
+    size = len(buf)
+    while size and buf[size-1] in b"\r\n":
+        size -= 1
+    newline = buf.find(b"\n", 0, size)
+    if newline < 0:
+        return 1, size, size + 1
+    stride = newline + 1
+    eol = 2 if newline and buf[newline-1] == ord("\r") else 1
+    cols = stride - eol
+    rows = (size + eol) // stride
+    if rows * stride != size + eol:
+        raise ValueError(f"digit grid lines are not all {cols} digits long")
+    return rows, cols, stride
+
+def load_digit_grid(path: str) -> DigitGrid:
+    """Load a digit grid from the given file, with no per-cell objects and
+    no copy of the file.  The file is mapped read-only.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    rows, cols, stride = grid_shape(mm)
+    data = np.frombuffer(mm, dtype=np.uint8)
+    chars = np.lib.stride_tricks.as_strided(data, shape=(rows, cols), strides=(stride, 1), writeable=False)
+    return DigitGrid(rows, cols, stride, chars, mm)
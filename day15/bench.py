@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the day 15 search engines.
+Run from the day15 directory, eg "./bench.py flat --reps 10".
+"""
+from typing import Any
+from contextlib import redirect_stdout
+import argparse
+import os
+import io
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from day15 import (
+    INPUTFILE, load_input, parse_input, replicate_tile, dict_to_grid,
+    grid_search, flatten_grid, flat_search, replicate_flat, ENGINES,
+    distance_field, bucket_search, bidirectional_search, SearchStats,
+    RiskPlanner, out_of_core_search, solve, solve_batch,
+)
+from digitgrid import load_digit_grid
+
+
+def measure(func, *args) -> tuple[Any, float, int]:
+    """Call func with the given arguments, and return its result, the
+    elapsed time in seconds, and the peak traced memory in bytes.
+    The function is called twice, since tracing memory slows it down.
+    """
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def report(name: str, result: int, elapsed: float, peak: int) -> None:
+    print(f"{name:>12s}: total {result:6d}  {elapsed:8.3f} sec  {peak/1e6:8.1f} MB peak")
+
+def tiled_grid(reps: int) -> list[list[int]]:
+    tile = parse_input(load_input(INPUTFILE))
+    return dict_to_grid(replicate_tile(tile, reps))
+
+
+def bench_flat(opt) -> None:
+    """Compare grid_search() on nested lists with flat_search() on a flat grid."""
+    print(f"flat grid vs. grid_search, {opt.reps}x{opt.reps} tiles")
+    grid = tiled_grid(opt.reps)
+    flat, _, _ = flatten_grid(grid)
+    grid_bytes = sys.getsizeof(grid) + sum(sys.getsizeof(row) for row in grid)
+    print(f"grid storage: {grid_bytes/1e6:.1f} MB as lists, {sys.getsizeof(flat)/1e6:.1f} MB flat")
+
+    expected, elapsed, peak = measure(grid_search, grid)
+    report("grid_search", expected, elapsed, peak)
+
+    def run_flat(grid):
+        return flat_search(*flatten_grid(grid))
+    result, elapsed, peak = measure(run_flat, grid)
+    report("flat_search", result, elapsed, peak)
+    assert result == expected
+
+def bench_engines(opt) -> None:
+    """Compare the flat grid engines on tiled copies of the input."""
+    tile = flatten_grid(dict_to_grid(parse_input(load_input(INPUTFILE))))
+    for reps in opt.tiles:
+        grid = replicate_flat(*tile, reps)
+        print(f"{reps}x{reps} tiles, {grid[1]} rows, {grid[2]} columns")
+        expected = None
+        for name, engine in ENGINES.items():
+            start = time.perf_counter()
+            result = engine(*grid)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>12s}: total {result:6d}  {elapsed:8.3f} sec")
+            assert expected is None or result == expected
+            expected = result
+
+def bench_sweeps(opt) -> None:
+    """Report the number of distance_field() sweeps needed for tiled copies
+    of the input, and for a uniform grid with no detours.
+    """
+    tile = flatten_grid(dict_to_grid(parse_input(load_input(INPUTFILE))))
+    for reps in opt.tiles:
+        risks, rows, cols = replicate_flat(*tile, reps)
+        grids = [
+            ("input", np.frombuffer(risks, dtype=np.uint8).reshape(rows, cols)),
+            ("uniform", np.ones((rows, cols), dtype=np.uint8)),
+        ]
+        for name, grid in grids:
+            start = time.perf_counter()
+            dist, sweeps = distance_field(grid)
+            elapsed = time.perf_counter() - start
+            print(f"{reps:3d}x{reps} {name:>8s}: total {dist[-1, -1]:6d}  {sweeps:4d} sweeps  {elapsed:8.3f} sec")
+
+def bench_tiled(opt) -> None:
+    """Compare searching a materialized tiled grid with searching the tile
+    through a TiledRisks view.
+    """
+    tile = flatten_grid(dict_to_grid(parse_input(load_input(INPUTFILE))))
+
+    def run_materialized(reps):
+        return bucket_search(*replicate_flat(*tile, reps))
+
+    def run_virtual(reps):
+        return bucket_search(*tile, reps=reps)
+
+    for reps in opt.tiles:
+        print(f"{reps}x{reps} tiles")
+        expected, elapsed, peak = measure(run_materialized, reps)
+        report("materialized", expected, elapsed, peak)
+        result, elapsed, peak = measure(run_virtual, reps)
+        report("virtual", result, elapsed, peak)
+        assert result == expected
+
+def bench_load(opt) -> None:
+    """Compare parsing a tiled risk map with parse_input() and loading it
+    with load_digit_grid().
+    """
+    tile = flatten_grid(dict_to_grid(parse_input(load_input(INPUTFILE))))
+    risks, rows, cols = replicate_flat(*tile, opt.reps)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        for r in range(rows):
+            f.write("".join(str(risk) for risk in risks[r*cols:(r+1)*cols]) + "\n")
+        f.flush()
+        print(f"{rows} rows, {cols} columns")
+
+        def run_parse(path):
+            return len(parse_input(load_input(path)))
+
+        def run_mmap(path):
+            return load_digit_grid(path).chars.size
+
+        for name, func in (("parse_input", run_parse), ("digit grid", run_mmap)):
+            result, elapsed, peak = measure(func, f.name)
+            print(f"{name:>12s}: {result} cells  {elapsed:8.3f} sec  {peak/1e6:8.1f} MB peak")
+
+def bench_bidir(opt) -> None:
+    """Compare the one-directional A* searches with bidirectional A*."""
+    print(f"{opt.reps}x{opt.reps} tiles")
+    grid = tiled_grid(opt.reps)
+    flat = flatten_grid(grid)
+    searches = [
+        ("grid_search", lambda stats: grid_search(grid, stats=stats)),
+        ("flat_search", lambda stats: flat_search(*flat, stats=stats)),
+        ("bidir", lambda stats: bidirectional_search(*flat, stats=stats)),
+    ]
+    for name, func in searches:
+        stats = SearchStats()
+        result = func(stats)
+        print(f"{name:>12s}: total {result:6d}  {stats}")
+
+def bench_replan(opt) -> None:
+    """Compare RiskPlanner's incremental repairs after random single-cell
+    updates with recomputing the search from scratch.
+    """
+    tile = flatten_grid(dict_to_grid(parse_input(load_input(INPUTFILE))))
+    risks, rows, cols = replicate_flat(*tile, opt.reps)
+    print(f"{rows} rows, {cols} columns, {opt.updates} updates")
+    rng = random.Random(opt.seed)
+    updates = [(rng.randrange(rows), rng.randrange(cols), rng.randint(1, 9)) for _ in range(opt.updates)]
+
+    start = time.perf_counter()
+    planner = RiskPlanner(risks, rows, cols)
+    total = planner.best_total()
+    print(f"initial planner search: total {total}  {time.perf_counter() - start:8.3f} sec")
+
+    start = time.perf_counter()
+    totals = []
+    for r, c, risk in updates:
+        planner.update_cell(r, c, risk)
+        totals.append(planner.best_total())
+    elapsed = time.perf_counter() - start
+    print(f"{'incremental':>12s}: {elapsed:8.3f} sec  {1000*elapsed/len(updates):8.3f} ms/update")
+
+    # Full recomputation is slow, so only time it for the first few updates.
+    risks = bytearray(risks)
+    start = time.perf_counter()
+    for i, (r, c, risk) in enumerate(updates[:opt.recompute]):
+        risks[r*cols + c] = risk
+        assert bucket_search(risks, rows, cols) == totals[i]
+    elapsed = time.perf_counter() - start
+    print(f"{'recompute':>12s}: {elapsed:8.3f} sec  {1000*elapsed/opt.recompute:8.3f} ms/update"
+          f"  ({opt.recompute} updates)")
+
+def bench_disk(opt) -> None:
+    """Solve a random square risk map with about the given number of cells,
+    written to a scratch file, using out_of_core_search().
+    """
+    side = int(opt.cells ** 0.5)
+    rng = np.random.default_rng(opt.seed)
+    with tempfile.NamedTemporaryFile("wb", suffix=".txt") as f:
+        for r in range(side):
+            f.write((rng.integers(1, 10, side, dtype=np.uint8) + ord("0")).tobytes() + b"\n")
+        f.flush()
+        print(f"{side} rows, {side} columns, {side*side} cells")
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = out_of_core_search(f.name)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"{'disk':>12s}: total {result}  {elapsed:8.3f} sec  max RSS {rss/1e3:.1f} -> {peak/1e3:.1f} MB")
+
+def bench_batch(opt) -> None:
+    """Compare the throughput of solve_batch() with calling solve() on each
+    grid in turn.
+    """
+    side = int(opt.batch_cells ** 0.5)
+    rng = np.random.default_rng(opt.seed)
+    grids = [(bytearray(rng.integers(1, 10, side*side, dtype=np.uint8).tobytes()), side, side)
+             for _ in range(opt.grids)]
+    print(f"{opt.grids} grids of {side} rows, {side} columns, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    expected = []
+    for risks, rows, cols in grids:
+        lines = ["".join(str(risk) for risk in risks[r*cols:(r+1)*cols]) for r in range(rows)]
+        expected.append(solve(lines))
+    elapsed = time.perf_counter() - start
+    print(f"{'serial solve':>16s}: {elapsed:8.3f} sec  {opt.grids/elapsed:8.1f} grids/sec")
+
+    for workers in range(1, opt.workers + 1):
+        start = time.perf_counter()
+        results = dict(solve_batch(grids, workers=workers))
+        elapsed = time.perf_counter() - start
+        assert [results[i] for i in range(len(grids))] == expected
+        print(f"{f'batch, {workers} workers':>16s}: {elapsed:8.3f} sec  {opt.grids/elapsed:8.1f} grids/sec")
+
+
+BENCHMARKS = {
+    "flat": bench_flat,
+    "engines": bench_engines,
+    "sweeps": bench_sweeps,
+    "tiled": bench_tiled,
+    "load": bench_load,
+    "bidir": bench_bidir,
+    "replan": bench_replan,
+    "disk": bench_disk,
+    "batch": bench_batch,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bench", choices=BENCHMARKS, help="Benchmark to run")
+    parser.add_argument("--reps", type=int, default=5, help="Tile replication factor")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[5, 20],
+                        help="Tile replication factors for the engines benchmark")
+    parser.add_argument("--updates", type=int, default=1000, help="Number of random cell updates")
+    parser.add_argument("--recompute", type=int, default=20,
+                        help="Number of updates to time with full recomputation")
+    parser.add_argument("--cells", type=int, default=10**7, help="Cells in the out-of-core map")
+    parser.add_argument("--grids", type=int, default=200, help="Number of grids in a batch")
+    parser.add_argument("--batch-cells", type=int, default=10**4, help="Cells in each grid of a batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Maximum number of workers")
+    parser.add_argument("--seed", type=int, default=15, help="Random seed")
+    opt = parser.parse_args()
+    return opt
+
+def main():
+    opt = parse_args()
+    BENCHMARKS[opt.bench](opt)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,20 @@
 #
 #  Advent of Code 2019 - Day 15
 #
-from typing import Sequence, Any
+from typing import Sequence, Optional, Iterator, Any
 from pathlib import Path
 from collections import defaultdict
+from dataclasses import dataclass
 from heapq import heappush, heappop
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+import mmap
+import tempfile
 import time
+import numpy as np
 from location import Location
+from digitgrid import load_digit_grid, grid_shape
 
 INPUTFILE = "input.txt"
 
@@ -85,11 +93,26 @@ def dict_to_grid(risks):
         # print("".join([str(risks[Location(r, c)]) for c in range(cols)]))
     return result
 
-def grid_search(grid: list[list[int]]) -> int:
-    start = time.time()
+@dataclass
+class SearchStats:
+    """A SearchStats instance collects the counters reported by a search.
+    numpy_search() sweeps whole arrays rather than expanding states, so it
+    reports the number of sweeps instead.
+    """
+    expanded: int = 0
+    pushes: int = 0
+    sweeps: int = 0
+    elapsed: float = 0.0
+
+    def __str__(self) -> str:
+        if self.sweeps:
+            return f"{self.sweeps} sweeps, {self.elapsed:.3f} sec"
+        return f"expanded {self.expanded} states, {self.pushes} heap pushes, {self.elapsed:.3f} sec"
+
+def grid_search(grid: list[list[int]], stats: Optional[SearchStats] = None) -> int:
+    start = time.perf_counter()
     rows = len(grid)
     cols = len(grid[0])
-    print(f"{rows} rows, {cols} columns")
     assert rows == cols
     
     rmax = rows - 1
@@ -98,6 +121,7 @@ def grid_search(grid: list[list[int]]) -> int:
 
     queue = []
     visited = set()
+    pushes = 1
 
     r, c = 0, 0
     dist = rcmax - r - c
@@ -117,22 +141,419 @@ def grid_search(grid: list[list[int]]) -> int:
                     dist = rcmax - r1 - c1
                     new_total_risk = total_risk + grid[r1][c1]
                     heappush(queue, (dist + new_total_risk , new_total_risk, (r1, c1)))
-    print(f"Examined {len(visited)} states")
-    print(f"Found path to @({r}, {c}) with total risk {total_risk}")
-    print(f"elapsed time: {time.time() - start} sec")
+                    pushes += 1
+    if stats:
+        stats.expanded = len(visited)
+        stats.pushes = pushes
+        stats.elapsed = time.perf_counter() - start
+    return total_risk
+
+FlatGrid = tuple[bytearray, int, int] # (risks, rows, cols)
+
+def flatten_grid(grid: list[list[int]]) -> FlatGrid:
+    """Return the given grid as one flat bytearray of risks, indexed by
+    r*cols + c, along with the number of rows and columns.
+    """
+    rows = len(grid)
+    cols = len(grid[0])
+    risks = bytearray(rows * cols)
+    for r, row in enumerate(grid):
+        risks[r*cols:(r+1)*cols] = bytes(row)
+    return risks, rows, cols
+
+class TiledRisks:
+    """A TiledRisks instance is a read-only view of a flat risk tile repeated
+    reps x reps times, with each repetition's risks incremented by its tile
+    row plus tile column, wrapping from 9 back to 1.  Risks are computed on
+    demand from the nine possible increments of the tile, so memory does not
+    grow with reps.
+    """
+
+    def __init__(self, tile: bytearray, rows: int, cols: int, reps: int):
+        self.rows = rows
+        self.cols = cols
+        self.reps = reps
+        self.width = cols * reps
+        self._bumped = [bytes(1 + (risk - 1 + n) % 9 for risk in tile) for n in range(9)]
+
+    def __len__(self) -> int:
+        return self.rows * self.reps * self.width
+
+    def __getitem__(self, idx: int) -> int:
+        r, c = divmod(idx, self.width)
+        tr, r = divmod(r, self.rows)
+        tc, c = divmod(c, self.cols)
+        return self._bumped[(tr + tc) % 9][r * self.cols + c]
+
+def flat_search(risks: bytearray, rows: int, cols: int, reps: int = 1,
+                stats: Optional[SearchStats] = None) -> int:
+    """Return the lowest total risk of any path from the top left to the
+    bottom right of a flat risk grid.  This is the same A* search as
+    grid_search(), but locations are plain integer indexes, and the visited
+    set and best known totals are kept in flat arrays.  Each heap entry is
+    one int, packing the estimated total, the total risk so far and the
+    index into separate bit fields, so it orders the same as a tuple
+    would, without allocating one.
+    If reps > 1, the grid is searched as a TiledRisks view of reps x reps tiles.
+    """
+    start = time.perf_counter()
+    if reps > 1:
+        risks = TiledRisks(risks, rows, cols, reps)
+        rows, cols = rows * reps, cols * reps
+    size = rows * cols
+    finish = size - 1
+    rcmax = rows + cols - 2
+    visited = bytearray(size)
+    best = array('i', [-1]) * size
+    expanded = 0
+    pushes = 1
+
+    # Risks are at most 9, so no total exceeds 9 * size.
+    idx_bits = size.bit_length()
+    risk_shift = idx_bits
+    est_shift = idx_bits + (9 * size).bit_length()
+    idx_mask = (1 << idx_bits) - 1
+    risk_mask = (1 << (est_shift - risk_shift)) - 1
+
+    queue = [rcmax << est_shift]
+    best[0] = 0
+    total_risk = -1
+    while queue:
+        entry = heappop(queue)
+        total_risk = (entry >> risk_shift) & risk_mask
+        idx = entry & idx_mask
+        if idx == finish:
+            break
+        if visited[idx]:
+            continue
+        visited[idx] = 1
+        expanded += 1
+        r, c = divmod(idx, cols)
+        for nayb in (
+            idx - cols if r > 0 else -1,
+            idx - 1 if c > 0 else -1,
+            idx + cols if r < rows - 1 else -1,
+            idx + 1 if c < cols - 1 else -1,
+        ):
+            if nayb < 0 or visited[nayb]:
+                continue
+            new_total_risk = total_risk + risks[nayb]
+            if 0 <= best[nayb] <= new_total_risk:
+                continue
+            best[nayb] = new_total_risk
+            r1, c1 = divmod(nayb, cols)
+            heappush(queue, ((new_total_risk + rcmax - r1 - c1) << est_shift) |
+                     (new_total_risk << risk_shift) | nayb)
+            pushes += 1
+    if stats:
+        stats.expanded = expanded
+        stats.pushes = pushes
+        stats.elapsed = time.perf_counter() - start
     return total_risk
 
-def search(risks: dict[Location, int]) -> int:
-    start = time.time()
+def bucket_search(risks: bytearray, rows: int, cols: int, reps: int = 1,
+                  stats: Optional[SearchStats] = None) -> int:
+    """Return the lowest total risk of any path from the top left to the
+    bottom right of a flat risk grid, using Dial's algorithm.
+    Since every step costs 1..9, the queue is a circular array of ten
+    buckets indexed by total risk, and each queue operation is O(1).
+    If reps > 1, the grid is searched as a TiledRisks view of reps x reps tiles.
+    """
+    start = time.perf_counter()
+    if reps > 1:
+        risks = TiledRisks(risks, rows, cols, reps)
+        rows, cols = rows * reps, cols * reps
+    size = rows * cols
+    finish = size - 1
+    nbuckets = 10
+    best = array('i', [-1]) * size
+    buckets = [[] for _ in range(nbuckets)]
+
+    best[0] = 0
+    buckets[0].append(0)
+    queued = 1
+    expanded = 0
+    pushes = 1
+    total_risk = 0
+    result = -1
+    while queued and result < 0:
+        bucket = buckets[total_risk % nbuckets]
+        while bucket:
+            idx = bucket.pop()
+            queued -= 1
+            if best[idx] != total_risk:
+                continue
+            if idx == finish:
+                result = total_risk
+                break
+            expanded += 1
+            r, c = divmod(idx, cols)
+            for nayb in (
+                idx - cols if r > 0 else -1,
+                idx - 1 if c > 0 else -1,
+                idx + cols if r < rows - 1 else -1,
+                idx + 1 if c < cols - 1 else -1,
+            ):
+                if nayb < 0:
+                    continue
+                new_total_risk = total_risk + risks[nayb]
+                if 0 <= best[nayb] <= new_total_risk:
+                    continue
+                best[nayb] = new_total_risk
+                buckets[new_total_risk % nbuckets].append(nayb)
+                queued += 1
+                pushes += 1
+        total_risk += 1
+    if stats:
+        stats.expanded = expanded
+        stats.pushes = pushes
+        stats.elapsed = time.perf_counter() - start
+    return result
+
+def bidirectional_search(risks: bytearray, rows: int, cols: int, reps: int = 1,
+                         stats: Optional[SearchStats] = None) -> int:
+    """Return the lowest total risk of any path from the top left to the
+    bottom right of a flat risk grid, using bidirectional A* (NBA*).
+    The forward search finds the lowest risk from the start to each cell,
+    with the Manhattan distance to the finish as heuristic.  The backward
+    search finds the lowest risk from each cell to the finish, with the
+    Manhattan distance from the start as heuristic.  A cell popped from either
+    side is closed to both, and is only expanded if it could still lie on a
+    path better than the best meeting total found so far.
+    """
+    start = time.perf_counter()
+    if reps > 1:
+        risks = TiledRisks(risks, rows, cols, reps)
+        rows, cols = rows * reps, cols * reps
+    size = rows * cols
+    finish = size - 1
+    if finish == 0:
+        return 0
+    rcmax = rows + cols - 2
+    closed = bytearray(size)
+    best = (array('i', [-1]) * size, array('i', [-1]) * size)
+    queues = ([(rcmax, 0)], [(rcmax, finish)])
+    lower = [rcmax, rcmax]   # lower bound on the f values left in each queue
+    best[0][0] = 0
+    best[1][finish] = 0
+    total_risk = 1 << 62
+    expanded = 0
+    pushes = 2
+
+    while queues[0] and queues[1]:
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        forward = side == 0
+        queue = queues[side]
+        gs, go = best[side], best[1 - side]
+        f, idx = heappop(queue)
+        r, c = divmod(idx, cols)
+        h = rcmax - r - c if forward else r + c
+        if not closed[idx] and f == gs[idx] + h:
+            closed[idx] = 1
+            g = gs[idx]
+            # h + (rcmax - h) is the other side's heuristic at this cell
+            if f < total_risk and g + lower[1 - side] - (rcmax - h) < total_risk:
+                expanded += 1
+                for nayb in (
+                    idx - cols if r > 0 else -1,
+                    idx - 1 if c > 0 else -1,
+                    idx + cols if r < rows - 1 else -1,
+                    idx + 1 if c < cols - 1 else -1,
+                ):
+                    if nayb < 0 or closed[nayb]:
+                        continue
+                    new_g = g + (risks[nayb] if forward else risks[idx])
+                    if 0 <= gs[nayb] <= new_g:
+                        continue
+                    gs[nayb] = new_g
+                    r1, c1 = divmod(nayb, cols)
+                    heappush(queue, (new_g + (rcmax - r1 - c1 if forward else r1 + c1), nayb))
+                    pushes += 1
+                    if go[nayb] >= 0 and new_g + go[nayb] < total_risk:
+                        total_risk = new_g + go[nayb]
+        lower[side] = queue[0][0] if queue else total_risk
+        if lower[side] >= total_risk:
+            break
+    if stats:
+        stats.expanded = expanded
+        stats.pushes = pushes
+        stats.elapsed = time.perf_counter() - start
+    return total_risk
+
+class RiskPlanner:
+    """A RiskPlanner instance answers repeated queries for the lowest total
+    risk from the top left to the bottom right of a flat risk grid, while
+    cell risks change between queries.  It uses D* Lite: a backward search
+    from the finish keeps g (the risk from each cell to the finish) and rhs
+    (its one-step lookahead), so a risk update only repairs the cells whose
+    totals it actually changes.
+    """
+    INF = 1 << 62
+
+    def __init__(self, risks: bytearray, rows: int, cols: int):
+        self.risks = bytearray(risks)
+        self.rows = rows
+        self.cols = cols
+        size = rows * cols
+        self._goal = size - 1
+        self._g = [self.INF] * size
+        self._rhs = [self.INF] * size
+        self._in_queue = bytearray(size)
+        self._queue = []
+        self._rhs[self._goal] = 0
+        self._push(self._goal)
+
+    def update_cell(self, r: int, c: int, risk: int) -> None:
+        """Change the risk of the given cell.  This changes the cost of every
+        step into that cell, so each of its neighbors is brought up to date.
+        """
+        idx = r * self.cols + c
+        if self.risks[idx] == risk:
+            return
+        self.risks[idx] = risk
+        for nayb in self._neighbors(idx):
+            self._update_vertex(nayb)
+
+    def best_total(self) -> int:
+        """Return the lowest total risk of any path from the top left to the
+        bottom right, repairing the search first if cells have changed.
+        """
+        self._compute()
+        return self._g[0]
+
+    def _neighbors(self, idx: int) -> list[int]:
+        r, c = divmod(idx, self.cols)
+        result = []
+        if r > 0:
+            result.append(idx - self.cols)
+        if c > 0:
+            result.append(idx - 1)
+        if r < self.rows - 1:
+            result.append(idx + self.cols)
+        if c < self.cols - 1:
+            result.append(idx + 1)
+        return result
+
+    def _key(self, idx: int) -> tuple[int, int]:
+        k2 = min(self._g[idx], self._rhs[idx])
+        r, c = divmod(idx, self.cols)
+        return k2 + r + c, k2
+
+    def _push(self, idx: int) -> None:
+        heappush(self._queue, (*self._key(idx), idx))
+        self._in_queue[idx] = 1
+
+    def _update_vertex(self, idx: int) -> None:
+        g, rhs, risks = self._g, self._rhs, self.risks
+        if idx != self._goal:
+            rhs[idx] = min([risks[nayb] + g[nayb] for nayb in self._neighbors(idx) if g[nayb] < self.INF],
+                           default=self.INF)
+        if g[idx] != rhs[idx]:
+            self._push(idx)
+        else:
+            self._in_queue[idx] = 0
+
+    def _top(self) -> Optional[tuple[int, int, int]]:
+        """Return the lowest queue entry that is still current, discarding
+        any stale entries above it.
+        """
+        queue = self._queue
+        while queue:
+            k1, k2, idx = queue[0]
+            if self._in_queue[idx] and (k1, k2) == self._key(idx):
+                return queue[0]
+            heappop(queue)
+        return None
+
+    def _compute(self) -> None:
+        g, rhs = self._g, self._rhs
+        while True:
+            top = self._top()
+            if top is None:
+                break
+            if top[:2] >= self._key(0) and g[0] == rhs[0]:
+                break
+            idx = heappop(self._queue)[2]
+            self._in_queue[idx] = 0
+            if g[idx] > rhs[idx]:
+                g[idx] = rhs[idx]
+                for nayb in self._neighbors(idx):
+                    self._update_vertex(nayb)
+            else:
+                g[idx] = self.INF
+                self._update_vertex(idx)
+                for nayb in self._neighbors(idx):
+                    self._update_vertex(nayb)
+
+def relax_axis(dist: np.ndarray, risks: np.ndarray, axis: int, reverse: bool) -> np.ndarray:
+    """Relax every straight run of steps along the given axis at once.
+    Entering cells j+1..i costs S[i] - S[j], where S is the running sum of
+    risks, so the best total at i is S[i] + min(dist[j] - S[j]) over j <= i.
+    """
+    if reverse:
+        dist = np.flip(dist, axis)
+        risks = np.flip(risks, axis)
+    sums = np.cumsum(risks, axis=axis)
+    result = sums + np.minimum.accumulate(dist - sums, axis=axis)
+    return np.flip(result, axis) if reverse else result
+
+def distance_field(risks: np.ndarray) -> tuple[np.ndarray, int]:
+    """Return the lowest total risk of reaching every cell of the grid from
+    the top left, and the number of sweeps needed to find it.  Each sweep
+    relaxes the whole array rightwards, leftwards, downwards and upwards,
+    and the sweeps stop once one of them changes nothing.
+    """
+    risks = risks.astype(np.int64)
+    dist = np.full(risks.shape, 1 << 40, dtype=np.int64)
+    dist[0, 0] = 0
+    sweeps = 0
+    while True:
+        sweeps += 1
+        prev = dist
+        for axis in (1, 0):
+            for reverse in (False, True):
+                dist = relax_axis(dist, risks, axis, reverse)
+        if np.array_equal(dist, prev):
+            return dist, sweeps
+
+def numpy_search(risks: bytearray, rows: int, cols: int, reps: int = 1,
+                 stats: Optional[SearchStats] = None) -> int:
+    """Return the lowest total risk of any path from the top left to the
+    bottom right of a flat risk grid, using distance_field().  The number
+    of sweeps it needed is reported in stats.sweeps.
+    The sweeps work on whole arrays, so if reps > 1 the tiled grid is
+    built as a uint8 array (one byte per cell) rather than viewed lazily.
+    """
+    start = time.perf_counter()
+    grid = np.asarray(risks, dtype=np.uint8).reshape(rows, cols)
+    if reps > 1:
+        bump = np.arange(reps)
+        grid = 1 + (grid[None, :, None, :] - 1 + bump[:, None, None, None] + bump[None, None, :, None]) % 9
+        grid = grid.astype(np.uint8).reshape(rows * reps, cols * reps)
+    dist, sweeps = distance_field(grid)
+    if stats:
+        stats.sweeps = sweeps
+        stats.elapsed = time.perf_counter() - start
+    return int(dist[-1, -1])
+
+ENGINES = {
+    "heap": flat_search,
+    "bucket": bucket_search,
+    "numpy": numpy_search,
+    "bidir": bidirectional_search,
+}
+
+def search(risks: dict[Location, int], stats: Optional[SearchStats] = None) -> int:
+    start = time.perf_counter()
     rmax = max([loc.r for loc in risks.keys()])
     cmax = max([loc.c for loc in risks.keys()])
-    print(f"{rmax+1} rows, {cmax+1} columns")
     START_LOC = Location(0, 0)
     FINISH_LOC = Location(rmax, cmax)
     dist = START_LOC.distance(FINISH_LOC)
 
     queue = []
     visited = set()
+    pushes = 1
     heappush(queue, (dist, 0, START_LOC))
     while queue:
         best_risk, total_risk, loc = heappop(queue)
@@ -148,9 +569,11 @@ def search(risks: dict[Location, int]) -> int:
                 dist = nayb.distance(FINISH_LOC)
                 new_risk = total_risk + risks[nayb]
                 heappush(queue, (new_risk + dist, new_risk, nayb))
-    print(f"Examined {len(visited)} states")
-    print(f"Found path to @({loc.r}, {loc.c}) with total risk {total_risk}")
-    print(f"elapsed time: {time.time() - start} sec")
+                pushes += 1
+    if stats:
+        stats.expanded = len(visited)
+        stats.pushes = pushes
+        stats.elapsed = time.perf_counter() - start
     return total_risk
 
 def replicate_tile(tile: dict[Location, int], reps: int = 0) -> dict[Location, int]:
@@ -165,20 +588,149 @@ def replicate_tile(tile: dict[Location, int], reps: int = 0) -> dict[Location, i
                 grid[Location(loc.r + dr, loc.c + dc)] = 1 + (risk - 1 + tr + tc) % 9
     return grid
 
-def solve2(lines: Lines) -> int:
-    """Solve the problem."""
+def replicate_flat(risks: bytearray, rows: int, cols: int, reps: int) -> FlatGrid:
+    """Return a flat grid made of reps x reps copies of the given flat tile,
+    with risks incremented the same way as replicate_tile().
+    """
+    bumped = [bytes(1 + (risk - 1 + n) % 9 for risk in risks) for n in range(2*reps - 1)]
+    result = bytearray()
+    for tr in range(reps):
+        for r in range(rows):
+            for tc in range(reps):
+                result += bumped[tr + tc][r*cols:(r+1)*cols]
+    return result, rows * reps, cols * reps
+
+def solve_file(path: str, engine: str = "bucket", reps: int = 1) -> int:
+    """Solve the problem for the risk map in the given file, loaded with
+    load_digit_grid() rather than parsed line by line.  The engine reads the
+    risks through a FlatDigits view of the mapped file, so the file is not
+    copied, except by numpy_search(), which works on whole arrays.
+    """
+    grid = load_digit_grid(path)
+    return ENGINES[engine](grid.flat(), grid.rows, grid.cols, reps=reps)
+
+def out_of_core_search(path: str, scratch_dir: Optional[str] = None) -> int:
+    """Return the lowest total risk of any path from the top left to the
+    bottom right of the risk map in the given file, for maps too large to
+    hold in memory.  The map is read through a read-only memory map, and
+    the best totals (plus one, so a fresh sparse file means "unknown") are
+    kept in a memory-mapped int32 scratch file.  Only the bucket queue of
+    frontier cells lives in RAM.
+    """
+    ZERO = ord("0")
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    rows, cols, stride = grid_shape(buf)
+    pad = stride - cols   # bytes at the end of each line
+    size = rows * cols
+    finish = size - 1
+    nbuckets = 10
+
+    with tempfile.TemporaryFile(dir=scratch_dir) as scratch:
+        scratch.truncate(4 * size)
+        dist_map = mmap.mmap(scratch.fileno(), 4 * size)
+        best = memoryview(dist_map).cast('i')
+        buckets = [[] for _ in range(nbuckets)]
+
+        best[0] = 1
+        buckets[0].append(0)
+        queued = 1
+        total_risk = 0
+        result = -1
+        while queued and result < 0:
+            bucket = buckets[total_risk % nbuckets]
+            while bucket:
+                idx = bucket.pop()
+                queued -= 1
+                if best[idx] != total_risk + 1:
+                    continue
+                if idx == finish:
+                    result = total_risk
+                    break
+                r, c = divmod(idx, cols)
+                for nayb, r1 in (
+                    (idx - cols if r > 0 else -1, r - 1),
+                    (idx - 1 if c > 0 else -1, r),
+                    (idx + cols if r < rows - 1 else -1, r + 1),
+                    (idx + 1 if c < cols - 1 else -1, r),
+                ):
+                    if nayb < 0:
+                        continue
+                    new_total_risk = total_risk + buf[nayb + r1 * pad] - ZERO
+                    if 0 < best[nayb] <= new_total_risk + 1:
+                        continue
+                    best[nayb] = new_total_risk + 1
+                    buckets[new_total_risk % nbuckets].append(nayb)
+                    queued += 1
+            total_risk += 1
+        best.release()
+        dist_map.close()
+    buf.close()
+    return result
+
+_batch_memory: Optional[SharedMemory] = None
+
+def _attach_batch(name: str) -> None:
+    """Attach a batch worker process to the shared grid memory block."""
+    global _batch_memory
+    _batch_memory = SharedMemory(name=name)
+
+def _batch_worker(job: tuple[int, int, int, int, str]) -> tuple[int, int]:
+    """Search one grid of the shared batch, read in place from shared memory."""
+    index, offset, rows, cols, engine = job
+    risks = _batch_memory.buf[offset:offset + rows * cols]
+    try:
+        return index, ENGINES[engine](risks, rows, cols)
+    finally:
+        risks.release()
+
+def solve_batch(grids: Sequence[FlatGrid], engine: str = "bucket",
+                workers: Optional[int] = None) -> Iterator[tuple[int, int]]:
+    """Search many flat grids across a process pool, and yield (index, total)
+    for each grid in completion order.  All the grids are copied once into a
+    single shared memory block, so the jobs sent to workers are just offsets
+    and shapes; no grid data is pickled.
+    """
+    offsets = []
+    size = 0
+    for risks, rows, cols in grids:
+        offsets.append(size)
+        size += rows * cols
+    memory = SharedMemory(create=True, size=max(size, 1))
+    try:
+        for offset, (risks, rows, cols) in zip(offsets, grids):
+            memory.buf[offset:offset + rows * cols] = risks
+        jobs = [(index, offset, rows, cols, engine)
+                for index, (offset, (_, rows, cols)) in enumerate(zip(offsets, grids))]
+        with Pool(workers, initializer=_attach_batch, initargs=(memory.name,)) as pool:
+            yield from pool.imap_unordered(_batch_worker, jobs)
+    finally:
+        memory.close()
+        memory.unlink()
+
+def solve2(lines: Lines, engine: Optional[str] = None, stats: Optional[SearchStats] = None) -> int:
+    """Solve the problem.  If stats is given, the search's counters are
+    recorded in it.
+    """
     tile = parse_input(lines)
+    if engine:
+        return ENGINES[engine](*flatten_grid(dict_to_grid(tile)), reps=5, stats=stats)
     risks = replicate_tile(tile, 5)
     # return search(risks)
     grid = dict_to_grid(risks)
-    return grid_search(grid)
+    return grid_search(grid, stats=stats)
 
-def solve(lines: Lines) -> int:
-    """Solve the problem."""
+def solve(lines: Lines, engine: Optional[str] = None, stats: Optional[SearchStats] = None) -> int:
+    """Solve the problem.  The engine, if given, names one of the flat
+    grid searches in ENGINES.  If stats is given, the search's counters
+    are recorded in it.
+    """
     risks = parse_input(lines)
     # return search(risks)
     grid = dict_to_grid(risks)
-    return grid_search(grid)
+    if engine:
+        return ENGINES[engine](*flatten_grid(grid), stats=stats)
+    return grid_search(grid, stats=stats)
 
 
 # PART 1
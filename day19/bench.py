@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the day 19 scanner alignment.
+Run from the day19 directory, eg "./bench.py pairs".
+"""
+from typing import Optional
+from collections import Counter, defaultdict
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from day19 import (
+    INPUTFILE, MIN_OVERLAP, load_input, parse_input, align_all,
+    align_arrays, beacon_array, ALIGN_METHODS, Scanner, align_scanners_parallel,
+    max_manhattan, max_manhattan_array, AlignmentCache,
+)
+from point3d import Point3D, ROTS
+
+
+def brute_force_align(ref, pts):
+    """Find the rotation and translation matching the given Point3D lists
+    one Rot3D and one Point3D at a time.
+    """
+    for rot in ROTS:
+        rotated = [rot * p for p in pts]
+        votes = Counter(q - p for p in rotated for q in ref)
+        delta, count = votes.most_common(1)[0]
+        if count >= MIN_OVERLAP:
+            return rot, delta
+    return None
+
+def brute_force_distances(scan, count=5, exact=True):
+    """Return the same neighbor lists as Scanner._distances(), by checking
+    every pair of beacons.  If exact is False, distances are truncated
+    float distances, as the cluster signatures used to be built from.
+    """
+    dists = defaultdict(list)
+    n = len(scan.beacons)
+    limit = 500 * 500 if exact else 500
+    for i in range(1, n):
+        p1 = scan.beacons[i]
+        for j in range(i):
+            d = (p1 - scan.beacons[j]).norm2() if exact else int(p1.distance(scan.beacons[j]))
+            if d > 0:
+                dists[i].append((d, j))
+                dists[j].append((d, i))
+    for i in dists:
+        dists[i].sort()
+        dists[i] = [(d, j) for d, j in dists[i][:count] if d < limit]
+    return dict(dists)
+
+def legacy_cluster_keys(scan) -> set[tuple[int, int, int]]:
+    """Return the cluster signatures of a scanner as they used to be built,
+    from sorted truncated float distances.
+    """
+    keys = set()
+    dists = brute_force_distances(scan, 2, exact=False)
+    for i, inaybs in dists.items():
+        if len(inaybs) < 2:
+            continue
+        (dij, j), (dik, k) = inaybs
+        djk = int(scan.beacons[j].distance(scan.beacons[k]))
+        keys.add(tuple(sorted([dij, djk, dik])))
+    return keys
+
+def random_scanner(n: int, rng: random.Random, half: Optional[int] = None) -> Scanner:
+    """Return a scanner with n random beacons, in a cube from -half to half
+    on each axis.  By default, the cube grows with n, to keep the density
+    of the puzzle input (about 25 beacons in a 2000-unit cube).
+    """
+    if half is None:
+        half = int(1000 * (n / 25) ** (1/3))
+    return Scanner("random", [Point3D(*(rng.randint(-half, half) for _ in range(3))) for _ in range(n)])
+
+
+def bench_pairs(opt) -> None:
+    """Time matching every ordered pair of input scanners, one pair at a time."""
+    scans = parse_input(load_input(INPUTFILE))
+    pairs = [(a, b) for a in scans for b in scans if a is not b][:opt.pairs]
+    print(f"{len(pairs)} scanner pairs")
+
+    start = time.perf_counter()
+    expected = [brute_force_align(a.beacons, b.beacons) is not None for a, b in pairs]
+    elapsed = time.perf_counter() - start
+    print(f"{'brute force':>12s}: {sum(expected)} matches  {1000*elapsed/len(pairs):8.3f} ms/pair")
+
+    arrays = {scan.name: beacon_array(scan.beacons) for scan in scans}
+    start = time.perf_counter()
+    found = [align_arrays(arrays[a.name], arrays[b.name]) is not None for a, b in pairs]
+    elapsed = time.perf_counter() - start
+    print(f"{'numpy':>12s}: {sum(found)} matches  {1000*elapsed/len(pairs):8.3f} ms/pair")
+    assert found == expected
+
+
+def bench_solve(opt) -> None:
+    """Time aligning all the input scanners with each alignment method."""
+    lines = load_input(INPUTFILE)
+    for method in [*ALIGN_METHODS, "map"]:
+        scans = parse_input(lines)
+        start = time.perf_counter()
+        beacon_map = align_all(scans, method, 0)
+        elapsed = time.perf_counter() - start
+        print(f"{method:>12s}: {len(beacon_map)} beacons  {elapsed:8.3f} sec")
+
+
+def bench_neighbors(opt) -> None:
+    """Compare the grid-hashed Scanner._distances() with checking every pair,
+    for random scanners at the input's density, and packed into the
+    puzzle's fixed +-1000 detection range.
+    """
+    rng = random.Random(opt.seed)
+    for name, half in (("input density", None), ("fixed range", 1000)):
+        print(name)
+        for n in opt.beacons:
+            scan = random_scanner(n, rng, half)
+            start = time.perf_counter()
+            dists = scan._distances(2)
+            elapsed = time.perf_counter() - start
+            line = f"{n:6d} beacons: grid {elapsed:8.3f} sec"
+            if n <= opt.max_brute:
+                start = time.perf_counter()
+                expected = brute_force_distances(scan, 2)
+                elapsed = time.perf_counter() - start
+                assert dists == expected
+                line += f"  all pairs {elapsed:8.3f} sec"
+            print(line)
+
+
+def bench_parallel(opt) -> None:
+    """Time align_scanners_parallel() on the input for 1 to N workers."""
+    lines = load_input(INPUTFILE)
+    print(f"{os.cpu_count()} CPUs")
+    base = None
+    for workers in range(1, opt.workers + 1):
+        scans = parse_input(lines)
+        start = time.perf_counter()
+        align_scanners_parallel(scans, workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        beacons = set()
+        for scan in scans:
+            beacons |= set(scan.beacons)
+        print(f"{workers:3d} workers: {len(beacons)} beacons  {elapsed:8.3f} sec  speedup {base/elapsed:5.2f}")
+
+
+def shared_signatures(keys: list[set]) -> Counter:
+    """Return a Counter of the signatures shared by each pair of scanners."""
+    index = defaultdict(list)
+    for a, scan_keys in enumerate(keys):
+        for key in scan_keys:
+            index[key].append(a)
+    shared = Counter()
+    for scanners in index.values():
+        for i, a in enumerate(scanners):
+            for b in scanners[i+1:]:
+                shared[(a, b)] += 1
+    return shared
+
+def bench_signatures(opt) -> None:
+    """Count the cluster signatures shared by scanner pairs that do not
+    actually overlap, with the legacy float signatures and the exact ones.
+    Random scanners at input density are added to the input scanners, so
+    there are many more non-overlapping pairs.
+    """
+    rng = random.Random(opt.seed)
+    scans = parse_input(load_input(INPUTFILE))
+    ninput = len(scans)
+    scans += [random_scanner(26, rng) for _ in range(opt.scanners)]
+    arrays = [beacon_array(scan.beacons) for scan in scans]
+    print(f"{ninput} input scanners, {opt.scanners} random scanners")
+
+    for name, keys in (
+        ("legacy", [legacy_cluster_keys(scan) for scan in scans]),
+        ("exact", [set(scan.clusters) for scan in scans]),
+    ):
+        shared = shared_signatures(keys)
+        false_input = false_random = 0
+        for (a, b), count in shared.items():
+            if align_arrays(arrays[a], arrays[b]):
+                continue
+            if b < ninput:
+                false_input += count
+            else:
+                false_random += count
+        print(f"{name:>8s}: {len(shared)} candidate pairs, false candidate matches:"
+              f" {false_input} between input scanners, {false_random} involving random scanners")
+
+
+def bench_noisy(opt) -> None:
+    """Add random fake beacons to every input scanner, and compare how the
+    alignment methods cope.  A method succeeds if it puts every scanner
+    where it is with the clean input.
+    """
+    lines = load_input(INPUTFILE)
+    clean = parse_input(lines)
+    align_all(clean, "map", 0)
+    expected = [scan.location for scan in clean]
+    for noise in opt.noise:
+        rng = random.Random(opt.seed)
+        print(f"{noise} fake beacons per scanner")
+        for method in ALIGN_METHODS:
+            scans = parse_input(lines)
+            for scan in scans:
+                scan.beacons += [Point3D(*(rng.randint(-1000, 1000) for _ in range(3))) for _ in range(noise)]
+            start = time.perf_counter()
+            try:
+                align_all(scans, method, 0)
+                ok = [scan.location for scan in scans] == expected
+                outcome = "aligned" if ok else "WRONG"
+            except (AssertionError, ValueError, TypeError) as err:
+                outcome = f"failed ({type(err).__name__})"
+            elapsed = time.perf_counter() - start
+            print(f"{method:>12s}: {outcome:20s}  {elapsed:8.3f} sec")
+
+        # Try every pair of scanners sharing a cluster, not just the tree edges.
+        pairs = [(a, b) for a in range(len(scans)) for b in range(len(scans))
+                 if a != b and scans[a].clusters.keys() & scans[b].clusters.keys()]
+        for method in ("clusters", "ransac"):
+            outcomes = Counter()
+            for a, b in pairs:
+                scan = Scanner(scans[b].name, list(scans[b].beacons))
+                try:
+                    outcomes["accepted" if ALIGN_METHODS[method](scan, scans[a]) else "rejected"] += 1
+                except (AssertionError, TypeError):
+                    outcomes["crashed"] += 1
+            print(f"{method:>12s}: {len(pairs)} candidate pairs  " +
+                  "  ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+
+
+def bench_separation(opt) -> None:
+    """Compare finding the largest scanner separation pair by pair with the
+    linear-time and vectorized methods.
+    """
+    rng = random.Random(opt.seed)
+    for n in opt.positions:
+        scans = [Scanner(str(i), [], location=Point3D(*(rng.randint(-10**6, 10**6) for _ in range(3))))
+                 for i in range(n)]
+        points = [scan.location for scan in scans]
+        array = beacon_array(points)
+        line = f"{n:7d} scanners:"
+        if n <= opt.max_brute:
+            start = time.perf_counter()
+            expected = max(scans[i].distance(scans[j]) for i in range(n) for j in range(i+1, n))
+            line += f"  pairs {time.perf_counter() - start:8.3f} sec"
+        else:
+            expected = None
+        start = time.perf_counter()
+        result = max_manhattan(points)
+        line += f"  linear {time.perf_counter() - start:8.4f} sec"
+        start = time.perf_counter()
+        assert max_manhattan_array(array) == result
+        line += f"  numpy {time.perf_counter() - start:8.4f} sec"
+        assert expected is None or result == expected
+        print(line)
+
+
+def bench_cache(opt) -> None:
+    """Time aligning the input with a cold alignment cache, a warm one, and
+    a warm one after one scanner's report has changed.
+    """
+    lines = load_input(INPUTFILE)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = f"{tmpdir}/alignments.json"
+        for run in ("cold", "warm", "changed"):
+            cache = AlignmentCache(path)
+            scans = parse_input(lines)
+            if run == "changed":
+                scans[-1].beacons.pop()
+            start = time.perf_counter()
+            beacon_map = align_all(scans, opt.method, 0, cache)
+            elapsed = time.perf_counter() - start
+            print(f"{run:>8s}: {len(beacon_map)} beacons  {cache.hits} hits  {cache.misses} misses"
+                  f"  {elapsed:8.3f} sec")
+
+
+BENCHMARKS = {
+    "pairs": bench_pairs,
+    "solve": bench_solve,
+    "neighbors": bench_neighbors,
+    "parallel": bench_parallel,
+    "signatures": bench_signatures,
+    "noisy": bench_noisy,
+    "separation": bench_separation,
+    "cache": bench_cache,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bench", choices=BENCHMARKS, help="Benchmark to run")
+    parser.add_argument("--pairs", type=int, default=200, help="Number of scanner pairs to match")
+    parser.add_argument("--beacons", type=int, nargs="+", default=[25, 100, 1000, 2000, 4000, 10000],
+                        help="Beacons per scanner for the neighbors benchmark")
+    parser.add_argument("--max-brute", type=int, default=2000,
+                        help="Largest scanner to check every pair of beacons for")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Maximum number of workers")
+    parser.add_argument("--scanners", type=int, default=500, help="Random scanners to add to the input")
+    parser.add_argument("--noise", type=int, nargs="+", default=[0, 5, 20],
+                        help="Fake beacons per scanner for the noisy benchmark")
+    parser.add_argument("--positions", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="Scanner positions for the separation benchmark")
+    parser.add_argument("--method", choices=ALIGN_METHODS, default="clusters",
+                        help="Alignment method for the cache benchmark")
+    parser.add_argument("--seed", type=int, default=19, help="Random seed")
+    opt = parser.parse_args()
+    return opt
+
+def main():
+    opt = parse_args()
+    BENCHMARKS[opt.bench](opt)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,19 @@
 #
 #  Advent of Code 2019 - Day 19
 #
-from typing import Sequence, Union, Optional, Any
+from typing import Sequence, Union, Optional, Any, Iterator
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, Counter, OrderedDict
+from heapq import heappush, heappop, nsmallest
+from multiprocessing import Pool
 from dataclasses import dataclass, field
+import hashlib
+import json
 import math
+import random
 import re
-from point3d import Point3D, Delta3D, Rot3D, ROTS
+import numpy as np
+from point3d import Point3D, Delta3D, Rot3D, ROTS, PROPER_ROTS
 
 INPUTFILE = "input.txt"
 
@@ -278,11 +284,36 @@ def parse_sections(lines: Lines) -> Sections:
 
 # Solution
 
-ClusterKey = tuple[int, int, int] # sorted integer distances
+ClusterKey = tuple[int, int, int, int] # sorted squared distances, Manhattan perimeter
 ClusterIds = tuple[int, int, int] # sorted beacon IDs
 ClusterMap = dict[ClusterKey, ClusterIds]
 
 ClusterCoords = tuple[Point3D, Point3D, Point3D] # unsorted beacon coordinates
+ClusterIndex = dict[ClusterKey, list[tuple[int, ClusterIds]]] # key -> (scanner, beacon IDs)
+
+PACK_OFFSET = 1 << 20 # coordinates must lie in [-PACK_OFFSET, PACK_OFFSET)
+
+ROT_MATRICES = np.array([rot.m for rot in PROPER_ROTS], dtype=np.int64) # (24, 3, 3)
+MIN_OVERLAP = 12 # beacons two overlapping scanners must have in common
+NEIGHBOR_RANGE = 500 # beacons further apart than this are not neighbors
+NEIGHBOR_CELL_BEACONS = 2 # average beacons per cell of the neighbor search grid
+RANSAC_TRIALS = 20 # shared clusters sampled by Scanner.align_ransac()
+
+
+def shell_cells(cx: int, cy: int, cz: int, ring: int) -> Iterator[tuple[int, int, int]]:
+    """Generate the grid cells at Chebyshev distance ring from the given cell."""
+    if ring == 0:
+        yield cx, cy, cz
+        return
+    span = range(-ring, ring + 1)
+    for dx in span:
+        for dy in span:
+            if abs(dx) == ring or abs(dy) == ring:
+                for dz in span:
+                    yield cx + dx, cy + dy, cz + dz
+            else:
+                yield cx + dx, cy + dy, cz - ring
+                yield cx + dx, cy + dy, cz + ring
 
 
 @dataclass
@@ -330,6 +361,54 @@ class Scanner:
             self.aligned = True
         return self.aligned
 
+    def align_numpy(self, ref: "Scanner") -> bool:
+        """Adjust the coordinates of this scanner's beacons to match those
+        of a reference scanner, using align_arrays() rather than clusters.
+        Return True if successful, else False.
+        """
+        found = align_arrays(beacon_array(ref.beacons), beacon_array(self.beacons))
+        if found:
+            k, offset = found
+            self.rotate(PROPER_ROTS[k])
+            self.translate(Delta3D(*map(int, offset)))
+            self.aligned = True
+        return self.aligned
+
+    def align_ransac(self, ref: "Scanner", max_trials: int = RANSAC_TRIALS,
+                     rng: Optional[random.Random] = None) -> bool:
+        """Adjust the coordinates of this scanner's beacons to match those
+        of a reference scanner, by sampled consensus.  Up to max_trials
+        randomly chosen shared clusters each propose a transform, which is
+        scored by counting transformed beacons that hit the reference's
+        hashed beacons, and accepted as soon as MIN_OVERLAP of them do.
+        Inconsistent clusters just fail to score.
+        Return True if successful, else False.
+        """
+        rng = rng or random
+        common = list(self.clusters.keys() & ref.clusters.keys())
+        if not common:
+            return False
+        ref_beacons = set(pack(p) for p in ref.beacons)
+        n = len(self.beacons)
+        for key in rng.sample(common, min(max_trials, len(common))):
+            points = [self.beacons[k] for k in self.clusters[key]]
+            found = match_triangles(points, [ref.beacons[k] for k in ref.clusters[key]])
+            if not found:
+                continue
+            rot, delta = found
+            inliers = 0
+            for i, p in enumerate(self.beacons):
+                if pack(rot * p + delta) in ref_beacons:
+                    inliers += 1
+                    if inliers >= MIN_OVERLAP:
+                        self.rotate(rot)
+                        self.translate(delta)
+                        self.aligned = True
+                        return True
+                elif inliers + n - i - 1 < MIN_OVERLAP:
+                    break
+        return False
+
     @property
     def clusters(self) -> ClusterMap:
         if not self._clusters:
@@ -339,30 +418,59 @@ class Scanner:
                 if len(inaybs) < 2:
                     continue
                 (dij, j), (dik, k) = inaybs
-                assert len(dists[j]) == len(dists[k]) == 2
-                djk = int(self.beacons[j].distance(self.beacons[k]))
-                sig = tuple(sorted([dij, djk, dik]))
+                pi, pj, pk = self.beacons[i], self.beacons[j], self.beacons[k]
+                djk = (pk - pj).norm2()
+                perimeter = (pj - pi).manhattan() + (pk - pj).manhattan() + (pk - pi).manhattan()
+                sig = (*sorted([dij, djk, dik]), perimeter)
                 ids = tuple(sorted([i, j, k]))
                 # print(f"{sig} -> {ids}")
                 self._clusters[sig] = ids
         return self._clusters
 
     def _distances(self, count=5):
-        dists = defaultdict(list)
+        """Return the (squared distance, ID) of up to count nearest neighbors
+        of each beacon, nearest first, considering only distances under
+        NEIGHBOR_RANGE.  Beacons are hashed into a grid of cubes sized to
+        their density, about NEIGHBOR_CELL_BEACONS to a cube but no larger
+        than NEIGHBOR_RANGE.  The cubes around each beacon are searched in
+        growing shells, until no beacon further out could be nearer than
+        the count found so far, or be in range.
+        """
+        dists = {}
         n = len(self.beacons)
-        for i in range(1, n):
-            p1 = self.beacons[i]
-            for j in range(i):
-                p2 = self.beacons[j]
-                d = int(p1.distance(p2))
-                if d > 0:
-                    dists[i].append((d, j))
-                    dists[j].append((d, i))
-        for i in sorted(dists, key=lambda k: self.beacons[k]):
-            dists[i].sort()
-            dists[i] = [(d, j) for d, j in dists[i][:count] if d < 500]
-            # print(f"{i}, {self.beacons[i]}:   " + 
-            #        ", ".join([f"{d} ({j})" for d, j in dists[i]]))
+        if n < 2:
+            return dists
+        xs = [p.x for p in self.beacons]
+        ys = [p.y for p in self.beacons]
+        zs = [p.z for p in self.beacons]
+        volume = (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1) * (max(zs) - min(zs) + 1)
+        size = int((volume * NEIGHBOR_CELL_BEACONS / n) ** (1/3))
+        size = max(1, min(size, NEIGHBOR_RANGE))
+        cells = defaultdict(list)
+        for i, p in enumerate(self.beacons):
+            cells[(p.x // size, p.y // size, p.z // size)].append(i)
+
+        max_d2 = NEIGHBOR_RANGE * NEIGHBOR_RANGE
+        for i, p in enumerate(self.beacons):
+            cx, cy, cz = p.x // size, p.y // size, p.z // size
+            inaybs = []
+            ring = 0
+            while True:
+                found = []
+                for cell in shell_cells(cx, cy, cz, ring):
+                    for j in cells.get(cell, ()):
+                        q = self.beacons[j]
+                        d2 = (q.x - p.x)**2 + (q.y - p.y)**2 + (q.z - p.z)**2
+                        if 0 < d2 < max_d2:
+                            found.append((d2, j))
+                if found:
+                    inaybs = nsmallest(count, inaybs + found)
+                # Beacons beyond this shell are at least ring * size away.
+                reach2 = (ring * size) ** 2
+                if reach2 >= max_d2 or (len(inaybs) == count and inaybs[-1][0] < reach2):
+                    break
+                ring += 1
+            dists[i] = inaybs
         return dists
 
 def align_clusters(cluster: ClusterKey, scan: Scanner, ref: Scanner) -> tuple[Rot3D, Delta3D]:
@@ -371,8 +479,16 @@ def align_clusters(cluster: ClusterKey, scan: Scanner, ref: Scanner) -> tuple[Ro
     Return the rotation, or None, if noe was found.
     """
     # print(f"#### align scanner {scan.name} to scanner {ref.name} using cluster {cluster}")
-
-    t1, t2, t3 = [ref.beacons[k] for k in ref.clusters[cluster]]
+    points = [scan.beacons[k] for k in scan.clusters[cluster]]
+    targets = [ref.beacons[k] for k in ref.clusters[cluster]]
+    return match_triangles(points, targets)
+
+def match_triangles(points: ClusterCoords, targets: ClusterCoords) -> Optional[tuple[Rot3D, Delta3D]]:
+    """Find the rotation and translation that take the three points of a
+    cluster onto the three target points of the same cluster, whose order
+    may differ.  Return them, or None, if none was found.
+    """
+    t1, t2, t3 = targets
     # print(f"t1: {t1}")
     # print(f"t2: {t2}")
     # print(f"t3: {t3}")
@@ -384,7 +500,7 @@ def align_clusters(cluster: ClusterKey, scan: Scanner, ref: Scanner) -> tuple[Ro
     # print(f"t13: {t13}")
     # print(f"t23: {t23}")
 
-    p1, p2, p3 = [scan.beacons[k] for k in scan.clusters[cluster]]
+    p1, p2, p3 = points
     # print(f"p1: {p1}")
     # print(f"p2: {p2}")
     # print(f"p3: {p3}")
@@ -396,21 +512,21 @@ def align_clusters(cluster: ClusterKey, scan: Scanner, ref: Scanner) -> tuple[Ro
     # print(f"d13: {d13}")
     # print(f"d23: {d23}")
 
-    if abs(d12) == abs(t12): 
+    if d12.norm2() == t12.norm2(): 
         q3 = t3
-        if abs(d23) == abs(t23):
+        if d23.norm2() == t23.norm2():
             q1, q2 = t1, t2
         else:
             q1, q2 = t2, t1
-    elif abs(d12) == abs(t23):
+    elif d12.norm2() == t23.norm2():
         q3 = t1
-        if abs(d23) == abs(t12):
+        if d23.norm2() == t12.norm2():
             q1, q2 = t3, t2
         else:
             q1, q2 = t2, t3
     else:
         q3 = t2
-        if abs(d13) == abs(t12):
+        if d13.norm2() == t12.norm2():
             q1, q2 = t1, t3
         else:
             q1, q2 = t3, t1
@@ -445,6 +561,104 @@ def align_clusters(cluster: ClusterKey, scan: Scanner, ref: Scanner) -> tuple[Ro
     return None
 
 
+def pack(p: Point3D) -> int:
+    """Pack the coordinates of a point into a single int."""
+    return ((p.x + PACK_OFFSET) << 42) | ((p.y + PACK_OFFSET) << 21) | (p.z + PACK_OFFSET)
+
+
+class BeaconMap:
+    """A BeaconMap instance is a growing map of all the beacons found so far,
+    in the coordinates of the first scanner.
+    _beacons ..... The set of beacons, as packed coordinates
+    _clusters .... Merged cluster index of all the scanners added, mapping
+                   each signature to the coordinates of its three beacons
+    """
+
+    def __init__(self):
+        self._beacons = set()
+        self._clusters = {}
+
+    def __len__(self) -> int:
+        return len(self._beacons)
+
+    def add(self, scan: Scanner) -> None:
+        """Add the beacons and clusters of an aligned scanner to the map."""
+        self._beacons.update(pack(p) for p in scan.beacons)
+        for key, ids in scan.clusters.items():
+            self._clusters.setdefault(key, tuple(scan.beacons[k] for k in ids))
+
+    def overlap(self, beacons: list[Point3D]) -> int:
+        """Return the number of the given beacons that are already mapped."""
+        return sum(1 for p in beacons if pack(p) in self._beacons)
+
+    def align(self, scan: Scanner) -> bool:
+        """Align a scanner against the whole map at once, and add it to the
+        map if successful.  Each cluster the scanner shares with the map
+        proposes a transform, which is accepted once it puts MIN_OVERLAP of
+        the scanner's beacons on mapped beacons.  Return True if successful,
+        else False.
+        """
+        for key in scan.clusters.keys() & self._clusters.keys():
+            points = [scan.beacons[k] for k in scan.clusters[key]]
+            found = match_triangles(points, self._clusters[key])
+            if not found:
+                continue
+            rot, delta = found
+            if self.overlap([rot * p + delta for p in scan.beacons]) >= MIN_OVERLAP:
+                scan.rotate(rot)
+                scan.translate(delta)
+                scan.aligned = True
+                self.add(scan)
+                return True
+        return False
+
+
+def map_scanners(scans: list[Scanner]) -> BeaconMap:
+    """Align every scanner against a global map of the beacons found so far,
+    grown from the first scanner, and return the map.
+    """
+    beacon_map = BeaconMap()
+    scans[0].aligned = True
+    beacon_map.add(scans[0])
+    unaligned = list(scans[1:])
+    while unaligned:
+        remaining = [scan for scan in unaligned if not beacon_map.align(scan)]
+        if len(remaining) == len(unaligned):
+            raise ValueError(f"Unable to align {len(remaining)} scanners")
+        unaligned = remaining
+    return beacon_map
+
+def beacon_array(beacons: list[Point3D]) -> np.ndarray:
+    """Return the given beacons as an (N, 3) integer array."""
+    return np.array([(p.x, p.y, p.z) for p in beacons], dtype=np.int64).reshape(-1, 3)
+
+def align_arrays(ref: np.ndarray, pts: np.ndarray,
+                 threshold: int = MIN_OVERLAP) -> Optional[tuple[int, np.ndarray]]:
+    """Find the proper rotation and translation that map at least threshold
+    of the given points onto reference points.  All 24 rotations are applied
+    in one batched matmul, then every (rotation, ref - rotated point) offset
+    is packed into one integer and the offsets vote with np.unique.
+    Return the index into PROPER_ROTS and the translation, or None.
+    """
+    if len(ref) == 0 or len(pts) == 0:
+        return None
+    rotated = np.einsum("kij,nj->kni", ROT_MATRICES, pts)            # (24, N, 3)
+    offsets = ref[None, None, :, :] - rotated[:, :, None, :]         # (24, N, M, 3)
+    offsets = offsets.reshape(len(ROT_MATRICES), -1, 3)
+    lo = offsets.min()
+    span = offsets.max() - lo + 1
+    shifted = offsets - lo
+    keys = (shifted[..., 0] * span + shifted[..., 1]) * span + shifted[..., 2]
+    keys += np.arange(len(ROT_MATRICES))[:, None] * span**3
+    values, counts = np.unique(keys, return_counts=True)
+    best = counts.argmax()
+    if counts[best] < threshold:
+        return None
+    k, key = divmod(int(values[best]), int(span)**3)
+    xy, z = divmod(key, int(span))
+    x, y = divmod(xy, int(span))
+    return k, np.array([x, y, z], dtype=np.int64) + lo
+
 def parse_input(lines: Lines) -> list[Scanner]:
     result = []
     sects = parse_sections(lines)
@@ -456,40 +670,264 @@ def parse_input(lines: Lines) -> list[Scanner]:
         result.append(Scanner(name, beacons))
     return result
 
-def align_scanners(scans):
-    aligned = [scans[0]]
-    unaligned = list(scans[1:])
-    while unaligned:
-        scan = unaligned.pop(0)
-        # print(f"======== {scan.name} ========")
-        for ref in aligned:
-            if scan.align(ref):
-                # print(f">>> aligned {scan.name} to {ref.name}")
-                aligned.append(scan)
-                break
-        if not scan.aligned:
-            unaligned.append(scan)
+ALIGN_METHODS = {
+    "clusters": Scanner.align,
+    "numpy": Scanner.align_numpy,
+    "ransac": Scanner.align_ransac,
+}
+
+def pair_fingerprint(scan: Scanner, ref: Scanner) -> str:
+    """Return a fingerprint of the current beacon coordinates of a scanner
+    and a reference scanner.  Beacon order does not matter.
+    """
+    digest = hashlib.sha1()
+    for beacons in (scan.beacons, ref.beacons):
+        digest.update(np.array(sorted(pack(p) for p in beacons), dtype=np.int64).tobytes())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class AlignmentCache:
+    """An AlignmentCache instance is an on-disk record of solved scanner
+    alignments, keyed by pair_fingerprint().  Each entry is the index into
+    ROTS and the translation that aligned the scanner to the reference, or
+    None if it could not be aligned.  The cache holds at most max_entries,
+    evicting the least recently used, and is stored as JSON in LRU order.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if self.path.exists():
+            self._entries.update(json.loads(self.path.read_text()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[list[int]]:
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: str, value: Optional[list[int]]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        self.path.write_text(json.dumps(list(self._entries.items())))
+
+    def align(self, scan: Scanner, ref: Scanner, align) -> bool:
+        """Align the scanner to the reference from the cache if this pair has
+        been solved before, else with the given align method, recording the
+        result.  Return True if successful, else False.
+        """
+        key = pair_fingerprint(scan, ref)
+        if key in self:
+            self.hits += 1
+            value = self.get(key)
+            if value is None:
+                return False
+            scan.rotate(ROTS[value[0]])
+            scan.translate(Delta3D(*value[1:]))
+            scan.aligned = True
+            return True
+        self.misses += 1
+        if not align(scan, ref):
+            self.put(key, None)
+            return False
+        loc = scan.location
+        self.put(key, [ROTS.index(scan._rotation), loc.x, loc.y, loc.z])
+        return True
+
+def cluster_index(scans: list[Scanner]) -> ClusterIndex:
+    """Return an index from every cluster signature to the scanners (by
+    position in the list) and beacon IDs where it occurs.
+    """
+    index = defaultdict(list)
+    for i, scan in enumerate(scans):
+        for key, ids in scan.clusters.items():
+            index[key].append((i, ids))
+    return index
+
+def overlap_graph(index: ClusterIndex) -> dict[int, Counter]:
+    """Return the overlap graph of the scanners in a cluster index, mapping
+    each scanner to a Counter of the signatures it shares with each other
+    scanner.
+    """
+    graph = defaultdict(Counter)
+    for entries in index.values():
+        scanners = sorted(set(i for i, _ in entries))
+        for a in scanners:
+            for b in scanners:
+                if a != b:
+                    graph[a][b] += 1
+    return graph
+
+def align_scanners(scans, method: str = "clusters", cache: Optional[AlignmentCache] = None):
+    """Align every scanner to the first one.  Scanners are aligned along a
+    maximum spanning tree of the overlap graph, grown from the first scanner
+    by always taking the strongest edge to an unaligned scanner, so each
+    scanner is aligned exactly once.  An edge whose alignment fails is
+    dropped in favor of the next strongest.  If a cache is given, pairs
+    solved on earlier runs are taken from it.
+    """
+    align = ALIGN_METHODS[method]
+    if cache is not None:
+        method_align = align
+        align = lambda scan, ref: cache.align(scan, ref, method_align)
+    graph = overlap_graph(cluster_index(scans))
+    scans[0].aligned = True
+    edges = []
+    for j, shared in graph[0].items():
+        heappush(edges, (-shared, 0, j))
+    remaining = len(scans) - 1
+    while edges and remaining:
+        _, i, j = heappop(edges)
+        scan = scans[j]
+        if scan.aligned or not align(scan, scans[i]):
+            continue
+        # print(f">>> aligned {scan.name} to {scans[i].name}")
+        remaining -= 1
+        for k, shared in graph[j].items():
+            if not scans[k].aligned:
+                heappush(edges, (-shared, j, k))
+    if remaining:
+        raise ValueError(f"Unable to align {remaining} scanners")
     return scans
 
-def solve2(lines: Lines) -> int:
-    """Solve the problem."""
+Transform = tuple[np.ndarray, np.ndarray] # rotation matrix, translation
+
+_pair_coords: Optional[list[np.ndarray]] = None
+
+def _init_pair_worker(coords: np.ndarray, offsets: list[int]) -> None:
+    """Split the packed beacon coordinates of all scanners, in a worker."""
+    global _pair_coords
+    _pair_coords = [coords[a:b] for a, b in zip(offsets, offsets[1:])]
+
+def _match_pair(pair: tuple[int, int]) -> tuple[int, int, Optional[tuple[int, tuple[int, int, int]]]]:
+    """Match scanner j to scanner i, in a worker."""
+    i, j = pair
+    found = align_arrays(_pair_coords[i].astype(np.int64), _pair_coords[j].astype(np.int64))
+    if found:
+        k, offset = found
+        found = k, tuple(map(int, offset))
+    return i, j, found
+
+def align_scanners_parallel(scans: list[Scanner], workers: Optional[int] = None) -> list[Scanner]:
+    """Align every scanner to the first one, testing candidate pairs across
+    a process pool.  Candidate pairs are those that share a cluster
+    signature.  All the beacon coordinates are sent to each worker once,
+    as a single int32 array, and each job is just a pair of scanner
+    numbers.  The relative transforms that come back are chained outwards
+    from the first scanner, and applied here.
+    """
+    graph = overlap_graph(cluster_index(scans))
+    pairs = [(i, j) for i in graph for j in graph[i] if i < j]
+    coords = np.concatenate([beacon_array(scan.beacons) for scan in scans]).astype(np.int32)
+    offsets = [0]
+    for scan in scans:
+        offsets.append(offsets[-1] + len(scan.beacons))
+
+    # links[i][j] maps scanner j's coordinates to scanner i's
+    links = defaultdict(dict)
+    with Pool(workers, initializer=_init_pair_worker, initargs=(coords, offsets)) as pool:
+        for i, j, found in pool.imap_unordered(_match_pair, pairs):
+            if found:
+                k, offset = found
+                rot, delta = ROT_MATRICES[k], np.array(offset)
+                links[i][j] = rot, delta
+                links[j][i] = rot.T, -rot.T @ delta
+
+    transforms = {0: (np.identity(3, dtype=np.int64), np.zeros(3, dtype=np.int64))}
+    queue = [0]
+    while queue:
+        i = queue.pop(0)
+        rot_i, delta_i = transforms[i]
+        for j, (rot, delta) in links[i].items():
+            if j not in transforms:
+                transforms[j] = rot_i @ rot, rot_i @ delta + delta_i
+                queue.append(j)
+    if len(transforms) < len(scans):
+        raise ValueError(f"Unable to align {len(scans) - len(transforms)} scanners")
+
+    for j, (rot, delta) in transforms.items():
+        scan = scans[j]
+        scan.rotate(Rot3D([[int(v) for v in row] for row in rot]))
+        scan.translate(Delta3D(*map(int, delta)))
+        scan.aligned = True
+    return scans
+
+def max_manhattan(points: list[Point3D]) -> int:
+    """Return the largest Manhattan distance between any two of the points,
+    in linear time.  |dx| + |dy| + |dz| is the largest of |dx ± dy ± dz|, so
+    it is enough to track the spread of x ± y ± z for the four sign choices.
+    """
+    if not points:
+        return 0
+    best = 0
+    for sy, sz in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+        values = [p.x + sy*p.y + sz*p.z for p in points]
+        best = max(best, max(values) - min(values))
+    return best
+
+def max_manhattan_array(points: np.ndarray) -> int:
+    """Return the largest Manhattan distance between any two rows of an
+    (N, 3) array of positions, as max_manhattan() does.
+    """
+    if len(points) == 0:
+        return 0
+    signs = np.array([[1, 1, 1], [1, 1, -1], [1, -1, 1], [1, -1, -1]], dtype=points.dtype)
+    values = points @ signs.T
+    return int((values.max(axis=0) - values.min(axis=0)).max())
+
+def align_all(scans: list[Scanner], method: str, workers: int,
+              cache: Optional[AlignmentCache] = None) -> BeaconMap:
+    """Align the scanners with the given method, or with
+    align_scanners_parallel() if workers is given, and return the map of
+    all their beacons.  A cache, if given, is used for the pairwise methods
+    and saved afterwards.
+    Raises ValueError if a cache is given with the "map" method or with
+    workers, since neither aligns scanners pairwise.
+    """
+    if cache is not None and (workers or method == "map"):
+        raise ValueError(f"an alignment cache needs one of {list(ALIGN_METHODS)}, with no workers")
+    if workers:
+        align_scanners_parallel(scans, workers)
+    elif method == "map":
+        return map_scanners(scans)
+    else:
+        align_scanners(scans, method, cache)
+        if cache is not None:
+            cache.save()
+    beacon_map = BeaconMap()
+    for scan in scans:
+        beacon_map.add(scan)
+    return beacon_map
+
+def solve2(lines: Lines, method: str = "map", workers: int = 0,
+           cache: Optional[AlignmentCache] = None) -> int:
+    """Solve the problem.  The arguments are as for solve()."""
     scans = parse_input(lines)
-    scans = align_scanners(scans)
-    max_dist = 0
-    for i in range(len(scans)-1):
-        for j in range(i+1, len(scans)):
-            dist = scans[i].distance(scans[j])
-            max_dist = max(dist, max_dist)
-    return max_dist
-
-def solve(lines: Lines) -> int:
-    """Solve the problem."""
+    align_all(scans, method, workers, cache)
+    return max_manhattan([scan.location for scan in scans])
+
+def solve(lines: Lines, method: str = "map", workers: int = 0,
+          cache: Optional[AlignmentCache] = None) -> int:
+    """Solve the problem.  The method is "map" or one of ALIGN_METHODS.
+    If workers is given, the scanners are aligned with
+    align_scanners_parallel() instead.  A cache, if given, is used and
+    saved by the pairwise ALIGN_METHODS, so a rerun on the same reports
+    skips the alignments already found.
+    """
     scans = parse_input(lines)
-    scans = align_scanners(scans)
-    beacons = set()
-    for scan in scans:
-        beacons |= set(scan.beacons)
-    return len(beacons)
+    return len(align_all(scans, method, workers, cache))
 
 
 # PART 1
@@ -62,6 +62,13 @@ class Delta3D:
     def __abs__(self) -> float:
         return math.sqrt(self.dx*self.dx + self.dy*self.dy + self.dz* self.dz)
 
+    def norm2(self) -> int:
+        """Exact squared length of this delta."""
+        return self.dx*self.dx + self.dy*self.dy + self.dz*self.dz
+
+    def manhattan(self) -> int:
+        return abs(self.dx) + abs(self.dy) + abs(self.dz)
+
     def __lt__(self, other: "Delta3D") -> bool:
         if self.dx != other.dx:
             return self.dx < other.dx
@@ -97,6 +104,12 @@ class Rot3D:
         dz = self.m[2][0] * v.dx + self.m[2][1] * v.dy + self.m[2][2] * v.dz
         return Delta3D(int(dx), int(dy), int(dz))
 
+    @property
+    def det(self) -> int:
+        """Determinant of the matrix: 1 for a proper rotation, -1 for a reflection."""
+        (a, b, c), (d, e, f), (g, h, i) = self.m
+        return a*(e*i - f*h) - b*(d*i - f*g) + c*(d*h - e*g)
+
 ROTS = []
 for i, j, k in permutations((0, 1, 2)):
     for ones in range(8):
@@ -108,3 +121,5 @@ for i, j, k in permutations((0, 1, 2)):
         # print(f"{len(ROTS):2d}: {str(matrix)}")
         ROTS.append(Rot3D(matrix))
 
+# The 24 rotations that are not reflections.
+PROPER_ROTS = [rot for rot in ROTS if rot.det == 1]
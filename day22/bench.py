@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the day 22 reactor engines.
+Run from the day22 directory, eg "./bench.py engines --engines compressed".
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from day22 import (
+    INPUTFILE, SAMPLE_CASES2, load_input, load_text, parse_input, ENGINES,
+    Cuboid, Reactor, StreamingReactor, iter_cuboids, box_intersection, box_volume,
+    add_cuboids, bitmap_cubes,
+)
+
+
+def bench_engines(opt) -> None:
+    """Time each engine on the part 2 samples and the input."""
+    cases = [(f"sample {i+1}", load_text(text), expected) for i, (text, expected) in enumerate(SAMPLE_CASES2)]
+    cases.append(("input", load_input(INPUTFILE), None))
+    for name, lines, expected in cases:
+        cuboids = parse_input(lines)
+        print(f"{name}: {len(cuboids)} commands")
+        for engine in opt.engines:
+            start = time.perf_counter()
+            result = ENGINES[engine](cuboids)
+            elapsed = time.perf_counter() - start
+            print(f"{engine:>12s}: {result:20d}  {elapsed:8.3f} sec")
+            assert expected is None or result == expected
+
+
+def synthetic_commands(n: int, rng: random.Random) -> list[Cuboid]:
+    """Return n random commands resembling the input: each takes the on/off
+    state and extents of a random input command, placed at a random spot
+    within the input's bounding box.  The box is scaled up with n, so the
+    commands overlap about as densely as the input's do.
+    """
+    cuboids = parse_input(load_input(INPUTFILE))
+    scale = max(1, (n / len(cuboids)) ** (1/3))
+    lo = [int(scale * min(getattr(c, f"{axis}min") for c in cuboids)) for axis in "xyz"]
+    hi = [int(scale * max(getattr(c, f"{axis}max") for c in cuboids)) for axis in "xyz"]
+    result = []
+    for _ in range(n):
+        model = rng.choice(cuboids)
+        bounds = []
+        for axis, a, b in zip("xyz", lo, hi):
+            size = getattr(model, f"{axis}max") - getattr(model, f"{axis}min")
+            start = rng.randint(a, max(a, b - size))
+            bounds += [start, start + size]
+        result.append(Cuboid(rng.choice(cuboids).on, *bounds))
+    return result
+
+
+def bench_scale(opt) -> None:
+    """Time the engines on synthetic inputs of increasing size.  If --large
+    is given, that many huge cuboids, 1.6 million on a side, are mixed in
+    at random, the first of them at the start.
+    """
+    rng = random.Random(opt.seed)
+    for n in opt.commands:
+        cuboids = synthetic_commands(n, rng)
+        for i in range(opt.large):
+            pos = rng.randrange(len(cuboids)) if i else 0
+            cuboids.insert(pos, Cuboid(i == 0 or rng.random() < 0.5, *(-800000, 800000) * 3))
+        print(f"{n} commands, {opt.large} large")
+        expected = None
+        for engine in opt.engines:
+            if engine == "reactor" and n > opt.max_reactor:
+                continue
+            start = time.perf_counter()
+            result = ENGINES[engine](cuboids)
+            elapsed = time.perf_counter() - start
+            print(f"{engine:>12s}: {result:20d}  {elapsed:8.3f} sec")
+            assert expected is None or result == expected
+            expected = result
+
+
+def bench_stream(opt) -> None:
+    """Feed a file of synthetic commands to a StreamingReactor, reading the
+    active count after every command, then compare the time to read it
+    with a Reactor holding the same cuboids.
+    """
+    rng = random.Random(opt.seed)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        for cuboid in synthetic_commands(opt.stream, rng):
+            f.write(f"{cuboid}\n")
+        f.flush()
+
+        streaming = StreamingReactor()
+        start = time.perf_counter()
+        with open(f.name) as lines:
+            for cuboid in iter_cuboids(lines):
+                streaming.add(cuboid)
+                streaming.active
+        elapsed = time.perf_counter() - start
+        print(f"{opt.stream} commands, {len(streaming._cubes)} cuboids: streamed in {elapsed:8.3f} sec")
+
+        with open(f.name) as lines:
+            reactor = Reactor().add_cubes(iter_cuboids(lines))
+    for name, r in (("reactor", reactor), ("streaming", streaming)):
+        start = time.perf_counter()
+        for _ in range(opt.polls):
+            result = r.active
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12s}: {result:20d}  {1e6*elapsed/opt.polls:10.3f} usec/read")
+
+
+def carved_commands(n: int, rng: random.Random) -> list[Cuboid]:
+    """Return a huge "on" cuboid, 1.6 million on a side, followed by n "off"
+    commands of input-like size at random spots within it.
+    """
+    cuboids = parse_input(load_input(INPUTFILE))
+    result = [Cuboid(True, *(-800000, 800000) * 3)]
+    for _ in range(n):
+        model = rng.choice(cuboids)
+        bounds = []
+        for axis in "xyz":
+            size = getattr(model, f"{axis}max") - getattr(model, f"{axis}min")
+            start = rng.randint(-800000, 800000 - size)
+            bounds += [start, start + size]
+        result.append(Cuboid(False, *bounds))
+    return result
+
+def bench_query(opt) -> None:
+    """Compare the indexed point and box queries with checking every active
+    cuboid, on the input reactor and on a huge cuboid carved up by --carve
+    small "off" commands.
+    """
+    rng = random.Random(opt.seed)
+    for name, cuboids, half in (
+        ("input", parse_input(load_input(INPUTFILE)), 100000),
+        ("carved", carved_commands(opt.carve, rng), 800000),
+    ):
+        start = time.perf_counter()
+        reactor = Reactor().add_cubes(cuboids)
+        elapsed = time.perf_counter() - start
+        cubes = list(reactor._cubes)
+        print(f"{name}: {len(cuboids)} commands, {len(cubes)} active cuboids, built in {elapsed:.3f} sec,"
+              f" {opt.queries} queries")
+        points = [tuple(rng.randint(-half, half) for _ in range(3)) for _ in range(opt.queries)]
+        boxes = []
+        for _ in range(opt.queries):
+            bounds = []
+            for _ in range(3):
+                lo = rng.randint(-half, half)
+                bounds += [lo, lo + rng.randint(0, 20000)]
+            boxes.append(Cuboid(True, *bounds))
+
+        def scan_point(xyz):
+            return any(cube.contains(xyz) for cube in cubes)
+
+        def scan_box(box):
+            total = 0
+            for cube in cubes:
+                common = box_intersection(cube.bounds, box.bounds)
+                if common:
+                    total += box_volume(common)
+            return total
+
+        for kind, queries, indexed, scan in (
+            ("points", points, lambda xyz: reactor.is_lit(*xyz), scan_point),
+            ("boxes", boxes, reactor.volume_in, scan_box),
+        ):
+            results = []
+            for method, func in (("index", indexed), ("scan", scan)):
+                start = time.perf_counter()
+                results.append([func(query) for query in queries])
+                elapsed = time.perf_counter() - start
+                print(f"{kind:>8s} {method:>6s}: {1e6*elapsed/len(queries):10.1f} usec/query")
+            assert results[0] == results[1]
+
+
+def bench_cuboid(opt) -> None:
+    """Time Cuboid.intersect() on every overlapping pair of input cuboids,
+    and Reactor.add() on the input, and report the peak memory of the
+    reactor run.
+    """
+    cuboids = parse_input(load_input(INPUTFILE))
+    pairs = [(a, b) for a in cuboids for b in cuboids if box_intersection(a.bounds, b.bounds)]
+    start = time.perf_counter()
+    for a, b in pairs:
+        a.intersect(b)
+    elapsed = time.perf_counter() - start
+    print(f"{'intersect':>10s}: {len(pairs)/elapsed:10.0f} calls/sec")
+
+    start = time.perf_counter()
+    reactor = Reactor().add_cubes(cuboids)
+    elapsed = time.perf_counter() - start
+    print(f"{'add':>10s}: {len(cuboids)/elapsed:10.0f} commands/sec")
+
+    tracemalloc.start()
+    reactor = Reactor().add_cubes(cuboids)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = sys.getsizeof(cuboids[0]) + sys.getsizeof(getattr(cuboids[0], "__dict__", None))
+    print(f"{len(reactor._cubes)} cuboids of {size} bytes, {peak/1e6:.1f} MB peak")
+
+
+def bench_init(opt) -> None:
+    """Compare the part 1 cube sets of add_cuboids() with the boolean volume
+    of bitmap_cubes(), on the input.
+    """
+    cuboids = parse_input(load_input(INPUTFILE))
+    results = []
+    for name, func in (("sets", lambda: len(add_cuboids(cuboids))),
+                       ("bitmap", lambda: int(bitmap_cubes(cuboids).sum()))):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>8s}: {result}  {1000*elapsed:10.3f} ms  {peak/1e6:8.1f} MB peak")
+        results.append(result)
+    assert results[0] == results[1]
+
+
+BENCHMARKS = {
+    "engines": bench_engines,
+    "scale": bench_scale,
+    "stream": bench_stream,
+    "query": bench_query,
+    "cuboid": bench_cuboid,
+    "init": bench_init,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("bench", choices=BENCHMARKS, help="Benchmark to run")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES),
+                        help="Engines to run")
+    parser.add_argument("--commands", type=int, nargs="+", default=[420, 1000, 2000, 5000, 10000],
+                        help="Numbers of synthetic commands for the scale benchmark")
+    parser.add_argument("--large", type=int, default=0,
+                        help="Number of huge cuboids to add to the scale benchmark commands")
+    parser.add_argument("--max-reactor", type=int, default=10000,
+                        help="Largest number of commands to run the reactor engine on")
+    parser.add_argument("--stream", type=int, default=10000,
+                        help="Number of synthetic commands for the stream benchmark")
+    parser.add_argument("--polls", type=int, default=1000, help="Number of active count reads")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of point and box queries")
+    parser.add_argument("--carve", type=int, default=300,
+                        help="Number of off commands carving the huge cuboid in the query benchmark")
+    parser.add_argument("--seed", type=int, default=22, help="Random seed")
+    opt = parser.parse_args()
+    return opt
+
+def main():
+    opt = parse_args()
+    BENCHMARKS[opt.bench](opt)
+
+
+if __name__ == '__main__':
+    main()
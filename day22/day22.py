@@ -3,10 +3,13 @@
 #  Advent of Code 2019 - Day 22
 #
 import pdb
-from typing import Sequence
+from typing import Sequence, Optional, Iterator, Iterable
 from pathlib import Path
+from collections import Counter, defaultdict
 from dataclasses import dataclass
+import itertools
 import re
+import numpy as np
 
 INPUTFILE = "input.txt"
 
@@ -170,14 +173,27 @@ def filter_blank_lines(lines: Lines) -> Lines:
 # Solution
 
 XYZ = tuple[int, int, int]
+Box = tuple[int, int, int, int, int, int] # xmin, xmax, ymin, ymax, zmin, zmax
 
 MIN_XYZ = -50
 MAX_XYZ = 50
 
+# Edge length of the cells of a CuboidIndex.  The input cuboids are around
+# 20000 on a side, so each spans a few cells along each axis.
+CELL_SIZE = 1 << 13
 
-@dataclass
+# Cuboids spanning more cells than this are recorded in a coarser grid of a
+# CuboidIndex, with cells LEVEL_SCALE times larger on a side.
+MAX_CELLS = 64
+LEVEL_SCALE = 8
+
+
+@dataclass(slots=True)
 class Cuboid:
-    on_off: str
+    """A Cuboid instance is a box of primitive cubes, with inclusive integer
+    bounds on each axis, to be turned on or off.
+    """
+    on: bool
     xmin: int
     xmax: int
     ymin: int
@@ -196,59 +212,42 @@ class Cuboid:
         )
 
     @property
-    def on(self) -> bool:
-        return self.on_off == "on"
+    def on_off(self) -> str:
+        return "on" if self.on else "off"
 
     @property
     def off(self) -> bool:
-        return self.on_off == "off"
+        return not self.on
 
-    def __eq__(self, other: "Cuboid") -> bool:
+    def __lt__(self, other: "Cuboid") -> bool:
         return (
-             self.xmin == other.xmin and self.xmax == other.xmax and
-             self.ymin == other.ymin and self.ymax == other.ymax and
-             self.zmin == other.zmin and self.zmax == other.zmax and
-             self.on_off == other.on_off
+            (self.xmin, self.ymin, self.zmin, self.xmax, self.ymax, self.zmax, self.on) <
+            (other.xmin, other.ymin, other.zmin, other.xmax, other.ymax, other.zmax, other.on)
         )
 
-    def __lt__(self, other: "Cuboid") -> bool:
-        if self.xmin != other.xmin:
-            return self.xmin < other.xmin 
-        if self.ymin != other.ymin:
-            return self.ymin < other.ymin 
-        if self.zmin != other.zmin:
-            return self.zmin < other.zmin 
-        if self.xmax != other.xmax:
-            return self.xmax < other.xmax 
-        if self.ymax != other.ymax:
-            return self.ymax < other.ymax 
-        if self.zmax != other.zmax:
-            return self.zmax < other.zmax 
-        return self.on_off , other.on_off
-
     @property
     def volume(self) -> int:
         """Report the number of primitive cubes contained by this cuboid."""
         return (self.xmax - self.xmin + 1) * (self.ymax - self.ymin + 1) * (self.zmax - self.zmin + 1)
 
-    def cubes(self) -> set[XYZ]:
+    def cubes(self, lo: int = MIN_XYZ, hi: int = MAX_XYZ) -> set[XYZ]:
         """Return the set of primitive cubes defined by this cuboid that are valid
-        for initialization.
+        for initialization, ie. with every coordinate from lo to hi.
         """
-        if self.xmax < MIN_XYZ or self.xmin > MAX_XYZ:
+        if self.xmax < lo or self.xmin > hi:
             return set()
-        xmax = min(self.xmax, MAX_XYZ)
-        xmin = max(self.xmin, MIN_XYZ)
+        xmax = min(self.xmax, hi)
+        xmin = max(self.xmin, lo)
 
-        if self.ymax < MIN_XYZ or self.ymin > MAX_XYZ:
+        if self.ymax < lo or self.ymin > hi:
             return set()
-        ymax = min(self.ymax, MAX_XYZ)
-        ymin = max(self.ymin, MIN_XYZ)
+        ymax = min(self.ymax, hi)
+        ymin = max(self.ymin, lo)
 
-        if self.zmax < MIN_XYZ or self.zmin > MAX_XYZ:
+        if self.zmax < lo or self.zmin > hi:
             return set()
-        zmax = min(self.zmax, MAX_XYZ)
-        zmin = max(self.zmin, MIN_XYZ)
+        zmax = min(self.zmax, hi)
+        zmin = max(self.zmin, lo)
 
         result = set()
         for x in range(xmin, xmax+1):
@@ -260,68 +259,182 @@ class Cuboid:
     def union(self, other) -> list["Cuboid"]:
         return [self, other]
 
-    def contains(self, XYZ) -> bool:
-        return False
+    def contains(self, xyz: XYZ) -> bool:
+        """Report whether the given primitive cube lies within this cuboid."""
+        x, y, z = xyz
+        return (self.xmin <= x <= self.xmax and
+                self.ymin <= y <= self.ymax and
+                self.zmin <= z <= self.zmax)
+
+    @property
+    def bounds(self) -> Box:
+        return self.xmin, self.xmax, self.ymin, self.ymax, self.zmin, self.zmax
 
-    def intersect(self, other) -> tuple["Cuboid", list["Cuboid"], list["Cuboid"]]:
+    def intersect(self, other) -> tuple[Optional["Cuboid"], list["Cuboid"], list["Cuboid"]]:
         """Return a cuboid representing the region where this cuboid overlaps the other, and a list of non-overlapping
         cuboids that cover the remaining volume of this cuboid and the other.
         """
         # check whether we overlap at all, first.
         if self.xmax < other.xmin or self.xmin > other.xmax:
             return None, [self], [other]
-        xlim = sorted([self.xmin, self.xmax, other.xmin, other.xmax])
-
         if self.ymax < other.ymin or self.ymin > other.ymax:
             return None, [self], [other]
-        ylim = sorted([self.ymin, self.ymax, other.ymin, other.ymax])
-
         if self.zmax < other.zmin or self.zmin > other.zmax:
             return None, [self], [other]
-        zlim = sorted([self.zmin, self.zmax, other.zmin, other.zmax])
 
         self_cubes = []
         other_cubes = []
-        for i in range(3):
-            # x = (xlim[i] + xlim[i+1] - 1) / 2
-            x0 = xlim[i] if i < 2 else xlim[i] + 1
-            x1 = xlim[i+1] if i > 0 else xlim[i+1] - 1
-            x = (x0 + x1) / 2
-            xself = self.xmin <= x <= self.xmax
-            xother = other.xmin <= x <= other.xmax
-            for j in range(3):
-                # y = (ylim[j] + ylim[j+1] - 1) / 2
-                y0 = ylim[j] if j < 2 else ylim[j] + 1
-                y1 = ylim[j+1] if j > 0 else ylim[j+1] - 1
-                y = (y0 + y1) / 2
-                yself = self.ymin <= y <= self.ymax
-                yother = other.ymin <= y <= other.ymax
-                for k in range(3):
-                    # z = (zlim[k] + zlim[k+1] - 1) / 2
-                    z0 = zlim[k] if k < 2 else zlim[k] + 1
-                    z1 = zlim[k+1] if k > 0 else zlim[k+1] - 1
-                    z = (z0 + z1) / 2
-                    zself = self.zmin <= z <= self.zmax
-                    zother = other.zmin <= z <= other.zmax
-
-                    # print(f"x,y,z: {x}, {y}, {z}   self? {xself},{yself},{zself}  other? {xother},{yother},{zother}")
+        common_cube = None
+        ysplit = split_axis(self.ymin, self.ymax, other.ymin, other.ymax)
+        zsplit = split_axis(self.zmin, self.zmax, other.zmin, other.zmax)
+        for x0, x1, xself, xother in split_axis(self.xmin, self.xmax, other.xmin, other.xmax):
+            for y0, y1, yself, yother in ysplit:
+                for z0, z1, zself, zother in zsplit:
                     if xself and yself and zself:
                         if xother and yother and zother:
-                            common_cube = Cuboid(other.on_off, x0, x1, y0, y1, z0, z1)
+                            common_cube = Cuboid(other.on, x0, x1, y0, y1, z0, z1)
                         else:
-                            self_cubes.append(Cuboid(self.on_off, x0, x1, y0, y1, z0, z1))
+                            self_cubes.append(Cuboid(self.on, x0, x1, y0, y1, z0, z1))
                     elif xother and yother and zother:
-                        other_cubes.append(Cuboid(other.on_off, x0, x1, y0, y1, z0, z1))
+                        other_cubes.append(Cuboid(other.on, x0, x1, y0, y1, z0, z1))
         return common_cube, self_cubes, other_cubes
 
 
+def split_axis(amin: int, amax: int, bmin: int, bmax: int) -> list[tuple[int, int, bool, bool]]:
+    """Split the span of two overlapping ranges along one axis into up to three
+    non-empty ranges: before, within and after their overlap.  Each is returned
+    as its inclusive bounds, and whether it lies within the first range and the
+    second.
+    """
+    lo = max(amin, bmin)
+    hi = min(amax, bmax)
+    result = []
+    if amin < lo or bmin < lo:
+        result.append((min(amin, bmin), lo - 1, amin < lo, bmin < lo))
+    result.append((lo, hi, True, True))
+    if amax > hi or bmax > hi:
+        result.append((hi + 1, max(amax, bmax), amax > hi, bmax > hi))
+    return result
+
+
+class CuboidIndex:
+    """A CuboidIndex instance is a hierarchical spatial hash over a collection
+    of cuboids.  Space is divided into uniform grids of cubic cells, one per
+    level, with cells LEVEL_SCALE times larger on a side at each level than
+    at the one below.  Each cuboid is recorded in every cell it overlaps, at
+    the lowest level where that is at most max_cells cells, so the cost of
+    adding one does not grow with its volume.  The cuboids that may overlap
+    a given box are found from the cells the box covers at each level,
+    without checking every cuboid.
+    cell_size .... The edge length of the grid cells at level 0.
+    max_cells .... The most cells a cuboid may be recorded in.
+    _cuboids ..... Dict of the indexed cuboids, by key.
+    _levels ...... Dict of the level each cuboid is recorded at, by key.
+    _grids ....... List of the grids, by level.  Each is a dict of the set of
+                   keys of the cuboids overlapping each cell, by cell.
+    """
+
+    def __init__(self, cell_size: int = CELL_SIZE, max_cells: int = MAX_CELLS):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cuboids = {}
+        self._levels = {}
+        self._grids = [defaultdict(set)]
+        self._next_key = 0
+
+    def __len__(self) -> int:
+        return len(self._cuboids)
+
+    def __iter__(self) -> Iterator[Cuboid]:
+        return iter(self._cuboids.values())
+
+    def _cell_ranges(self, cuboid: Cuboid, level: int) -> tuple[range, range, range]:
+        size = self.cell_size * LEVEL_SCALE ** level
+        return (
+            range(cuboid.xmin // size, cuboid.xmax // size + 1),
+            range(cuboid.ymin // size, cuboid.ymax // size + 1),
+            range(cuboid.zmin // size, cuboid.zmax // size + 1),
+        )
+
+    def add(self, cuboid: Cuboid) -> int:
+        """Add the given cuboid to the index, and return its key."""
+        key = self._next_key
+        self._next_key += 1
+        self._cuboids[key] = cuboid
+        level = 0
+        xr, yr, zr = self._cell_ranges(cuboid, level)
+        while len(xr) * len(yr) * len(zr) > self.max_cells:
+            level += 1
+            xr, yr, zr = self._cell_ranges(cuboid, level)
+        while len(self._grids) <= level:
+            self._grids.append(defaultdict(set))
+        self._levels[key] = level
+        grid = self._grids[level]
+        for cell in itertools.product(xr, yr, zr):
+            grid[cell].add(key)
+        return key
+
+    def remove(self, key: int) -> Cuboid:
+        """Remove the cuboid with the given key from the index, and return it."""
+        cuboid = self._cuboids.pop(key)
+        level = self._levels.pop(key)
+        grid = self._grids[level]
+        for cell in itertools.product(*self._cell_ranges(cuboid, level)):
+            keys = grid[cell]
+            keys.discard(key)
+            if not keys:
+                del grid[cell]
+        return cuboid
+
+    def containing(self, xyz: XYZ) -> Iterator[tuple[int, Cuboid]]:
+        """Generate the keys and cuboids of the indexed cuboids that contain the
+        given primitive cube, in no particular order.  Only the cell holding
+        the cube at each level is checked.
+        """
+        size = self.cell_size
+        for grid in self._grids:
+            cell = tuple(v // size for v in xyz)
+            for key in grid.get(cell, ()):
+                cuboid = self._cuboids[key]
+                if cuboid.contains(xyz):
+                    yield key, cuboid
+            size *= LEVEL_SCALE
+
+    def overlapping(self, box: Cuboid) -> list[tuple[int, Cuboid]]:
+        """Return the keys and cuboids of the indexed cuboids that overlap the
+        given box, in the order they were added.  At any level where the box
+        covers more cells than are occupied, the occupied cells are checked
+        instead.
+        """
+        keys = set()
+        for level, grid in enumerate(self._grids):
+            xr, yr, zr = self._cell_ranges(box, level)
+            if len(xr) * len(yr) * len(zr) > len(grid):
+                for (x, y, z), cell_keys in grid.items():
+                    if x in xr and y in yr and z in zr:
+                        keys |= cell_keys
+            else:
+                for cell in itertools.product(xr, yr, zr):
+                    cell_keys = grid.get(cell)
+                    if cell_keys:
+                        keys |= cell_keys
+        result = []
+        for key in sorted(keys):
+            cuboid = self._cuboids[key]
+            if (cuboid.xmin <= box.xmax and box.xmin <= cuboid.xmax and
+                cuboid.ymin <= box.ymax and box.ymin <= cuboid.ymax and
+                cuboid.zmin <= box.zmax and box.zmin <= cuboid.zmax):
+                result.append((key, cuboid))
+        return result
+
+
 class Reactor:
     """A Reactor instance records the active cubes in an AoC submarine reactor.
-    _cubes .... The set of non-overlapping cuboids that spans the actives cubes of the reactor
+    _cubes .... A CuboidIndex of the non-overlapping cuboids that span the active cubes of the reactor
     """
 
-    def __init__(self, debug: bool = False):
-        self._cubes = []
+    def __init__(self, debug: bool = False, cell_size: int = CELL_SIZE):
+        self._cubes = CuboidIndex(cell_size)
         self.debug = debug
 
     @property
@@ -339,92 +452,223 @@ class Reactor:
         for cube in cuboids:
             self.add(cube)
         return self
-    
+
+    def is_lit(self, x: int, y: int, z: int) -> bool:
+        """Report whether the given primitive cube is active.  The active
+        cuboids never overlap, so the search stops at the first match.
+        """
+        return any(True for _ in self._cubes.containing((x, y, z)))
+
+    def volume_in(self, box: Cuboid) -> int:
+        """Return the number of active cubes within the given box.  Its on/off
+        state is ignored.
+        """
+        total = 0
+        for _, cube in self._cubes.overlapping(box):
+            total += box_volume(box_intersection(cube.bounds, box.bounds))
+        return total
+
+    def _insert(self, cube: Cuboid) -> None:
+        """Record the given cuboid as active.  It must not overlap any active cuboid."""
+        self.log(f"<<<< {cube}")
+        self._cubes.add(cube)
+
+    def _remove(self, key: int) -> Cuboid:
+        """Remove the active cuboid with the given key, and return it."""
+        return self._cubes.remove(key)
+
     def add(self, add_cube: Cuboid) -> "Reactor":
+        """Apply the given cuboid to this reactor.  Only the active cuboids
+        that overlap it are visited.
+        A reference to the reactor is returned, to allow chaining.
+        """
         self.log(f"ADD: {add_cube} ({add_cube.volume} cubes)")
-        adding = add_cube.on
-        if not self._cubes:
-            if adding:
-                self._cubes.append(add_cube)
+        overlaps = self._cubes.overlapping(add_cube)
+
+        if add_cube.off:
+            # Replace every overlapping cuboid with the fragments of it that
+            # lie outside add_cube.
+            for key, cube in overlaps:
+                self.log(f"==== old cube {cube}")
+                _, a, _ = cube.intersect(add_cube)
+                self._remove(key)
+                for frag in a:
+                    self._insert(frag)
             return self
 
-        # self._cubes represent all active cubes, as a list of non-overlapping cuboids.
-        old_cubes = list(self._cubes)
+        # add_cubes represent the cuboid being added, as an index of non-overlapping
+        # cuboids.  Portions of it that overlap the active cuboids are
+        # progressively removed, visiting only the fragments each one overlaps.
+        add_cubes = CuboidIndex(self._cubes.cell_size, self._cubes.max_cells)
+        add_cubes.add(add_cube)
+        for _, cube in overlaps:
+            self.log(f"==== old cube {cube}")
+            for key, add_cube in add_cubes.overlapping(cube):
+                _, _, b = cube.intersect(add_cube)
+                add_cubes.remove(key)
+                for frag in b:
+                    add_cubes.add(frag)
+        for add_cube in add_cubes:
+            self._insert(add_cube)
+        return self
 
-        # new_cubes represent the portion of the self._cubes that remain after removing
-        # any overlaps with the given cuboid, when it is "off".  If the add_cube is "on"
-        # then new_cubes is not necessary.
-        new_cubes = []
 
-        # add_cubes represent the cuboid being added, as a list of non-overlapping
-        # cuboids.  Portions of the input add_cube that overlap with self._cubes 
-        # are progressively removed in this method.
-        add_cubes = [add_cube]
+class StreamingReactor(Reactor):
+    """A StreamingReactor is a Reactor that keeps a running count of its
+    active cubes, adjusted as cuboids are inserted and removed, so reading
+    it takes constant time.  Commands can be fed from any iterable of lines,
+    such as an open file, and are applied one at a time as they are read.
+    _active .... The number of active cubes.
+    """
 
-        while old_cubes:
-            cube = old_cubes.pop()
-            self.log(f"==== old cube {cube}")
-            ## pdb.set_trace()
-
-            intersects = False
-            fragments = []
-            for add_cube in add_cubes:
-                self.log(f"---- add cube {add_cube}")
-                ab, a, b = cube.intersect(add_cube)
-                if not ab:
-                    fragments.append(add_cube)
-                    continue
-                intersects = True
-
-                if adding:
-                    fragments.extend(b)
-                    self.log("fragments:\n" + "\n".join([f".... {frag}" for frag in b]))
-                else:
-                    new_cubes.extend(a)
-                    self.log("new cubes:\n" + "\n".join([f"<<<< {frag}" for frag in a]))
-                    break
-            if adding:
-                add_cubes = fragments
-            elif not intersects:
-                new_cubes.append(cube)
-                self.log(f"<<<< {cube}")
-            self.log(f"=============")
-
-        if adding:
-            self._cubes.extend(add_cubes)
-        else:
-            self._cubes = new_cubes
-        self._cubes.sort()
-        self.log("RESULT:\n" + "\n".join([f"<--- {frag}" for frag in self._cubes]))
+    def __init__(self, debug: bool = False, cell_size: int = CELL_SIZE):
+        super().__init__(debug, cell_size)
+        self._active = 0
 
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _insert(self, cube: Cuboid) -> None:
+        super()._insert(cube)
+        self._active += cube.volume
+
+    def _remove(self, key: int) -> Cuboid:
+        cube = super()._remove(key)
+        self._active -= cube.volume
+        return cube
+
+    def feed(self, lines: Iterable[str]) -> "StreamingReactor":
+        """Apply the commands in the given lines, as they are read.
+        A reference to the reactor is returned, to allow chaining.
+        """
+        for cuboid in iter_cuboids(lines):
+            self.add(cuboid)
         return self
 
-        
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "StreamingReactor":
+        """Return a new reactor, fed with the commands in the given file."""
+        with open(path) as f:
+            return cls(**kwargs).feed(f)
 
 
-def parse_input(lines: Lines) -> list[Cuboid]:
-    result = []
+def iter_cuboids(lines: Iterable[str]) -> Iterator[Cuboid]:
+    """Generate the cuboids in the given lines, one at a time.  Blank lines
+    are skipped.
+    """
     for line in lines:
+        line = line.strip()
+        if not line:
+            continue
         m = CUBOID_RE.match(line)
-        on_off = m.group(1)
-        result.append(Cuboid(on_off, *(map(int, m.groups()[1:]))))
-    return result
+        yield Cuboid(m.group(1) == "on", *(map(int, m.groups()[1:])))
 
-def solve2(lines: Lines) -> int:
-    """Solve the problem."""
-    cuboids = parse_input(lines)
+def parse_input(lines: Lines) -> list[Cuboid]:
+    return list(iter_cuboids(lines))
+
+def reactor_volume(cuboids: list[Cuboid]) -> int:
+    """Run the given cuboids through a Reactor, and return the number of
+    active cubes.
+    """
     reactor = Reactor()
     for cuboid in cuboids:
         reactor.add(cuboid)
     return reactor.active
 
-def add_cuboids(cuboids: list[Cuboid]) -> set[XYZ]:
+def compressed_volume(cuboids: list[Cuboid], max_cells: int = 1 << 23) -> int:
+    """Run the given cuboids, in order, and return the number of active cubes.
+    The cuboid boundaries on each axis split space into compressed cells, so
+    every command is a slice assignment on a boolean grid of cells, and the
+    active count is the sum of the volumes of the active cells.  The grid is
+    built in slabs of at most max_cells cells along x, to bound memory.
+    """
+    if not cuboids:
+        return 0
+    xs = sorted(set(c.xmin for c in cuboids) | set(c.xmax + 1 for c in cuboids))
+    ys = sorted(set(c.ymin for c in cuboids) | set(c.ymax + 1 for c in cuboids))
+    zs = sorted(set(c.zmin for c in cuboids) | set(c.zmax + 1 for c in cuboids))
+    xi = {x: i for i, x in enumerate(xs)}
+    yi = {y: i for i, y in enumerate(ys)}
+    zi = {z: i for i, z in enumerate(zs)}
+    dx = np.diff(np.array(xs, dtype=np.int64))
+    dy = np.diff(np.array(ys, dtype=np.int64))
+    dz = np.diff(np.array(zs, dtype=np.int64))
+    cells = [(xi[c.xmin], xi[c.xmax + 1], yi[c.ymin], yi[c.ymax + 1], zi[c.zmin], zi[c.zmax + 1], c.on)
+             for c in cuboids]
+
+    nx, ny, nz = len(dx), len(dy), len(dz)
+    slab = max(1, max_cells // (ny * nz))
+    total = 0
+    for x0 in range(0, nx, slab):
+        x1 = min(nx, x0 + slab)
+        grid = np.zeros((x1 - x0, ny, nz), dtype=bool)
+        for i0, i1, j0, j1, k0, k1, on in cells:
+            if i1 <= x0 or i0 >= x1:
+                continue
+            grid[max(i0, x0) - x0:min(i1, x1) - x0, j0:j1, k0:k1] = on
+        total += int((grid.astype(np.int64) @ dz) @ dy @ dx[x0:x1])
+    return total
+
+def box_intersection(a: Box, b: Box) -> Optional[Box]:
+    """Return the box where two boxes overlap, or None if they don't."""
+    xmin, xmax = max(a[0], b[0]), min(a[1], b[1])
+    if xmin > xmax:
+        return None
+    ymin, ymax = max(a[2], b[2]), min(a[3], b[3])
+    if ymin > ymax:
+        return None
+    zmin, zmax = max(a[4], b[4]), min(a[5], b[5])
+    if zmin > zmax:
+        return None
+    return xmin, xmax, ymin, ymax, zmin, zmax
+
+def box_volume(box: Box) -> int:
+    xmin, xmax, ymin, ymax, zmin, zmax = box
+    return (xmax - xmin + 1) * (ymax - ymin + 1) * (zmax - zmin + 1)
+
+def signed_volume(cuboids: list[Cuboid]) -> int:
+    """Run the given cuboids, in order, and return the number of active cubes.
+    The reactor is a Counter of boxes with signed multiplicities, such that
+    the active volume is the weighted sum of their volumes.  Each command
+    cancels its overlap with every existing box by adding the intersection
+    with the opposite weight, then adds itself with weight 1 if it is "on".
+    Boxes whose net weight drops to zero are removed.
+    """
+    boxes = Counter()
+    for cuboid in cuboids:
+        box = cuboid.bounds
+        update = Counter()
+        for other, weight in boxes.items():
+            common = box_intersection(box, other)
+            if common:
+                update[common] -= weight
+        if cuboid.on:
+            update[box] += 1
+        boxes.update(update)
+        for key in update:
+            if not boxes[key]:
+                del boxes[key]
+    return sum(box_volume(box) * weight for box, weight in boxes.items())
+
+ENGINES = {
+    "reactor": reactor_volume,
+    "compressed": compressed_volume,
+    "signed": signed_volume,
+}
+
+def solve2(lines: Lines, engine: str = "reactor") -> int:
+    """Solve the problem.  The engine names one of the functions in ENGINES."""
+    cuboids = parse_input(lines)
+    return ENGINES[engine](cuboids)
+
+def add_cuboids(cuboids: list[Cuboid], lo: int = MIN_XYZ, hi: int = MAX_XYZ) -> set[XYZ]:
     """Run the given cuboids, in order, and return the set of
-    primitive cubes that are activated, at the end.
+    primitive cubes from lo to hi on each axis that are activated, at the end.
     """
     reactor = set()
     for cuboid in cuboids:
-        cubes = cuboid.cubes()
+        cubes = cuboid.cubes(lo, hi)
         if not cubes:
             continue
         if cuboid.on:
@@ -433,11 +677,27 @@ def add_cuboids(cuboids: list[Cuboid]) -> set[XYZ]:
             reactor -= cubes
     return reactor
 
-def solve(lines: Lines) -> int:
-    """Solve the problem."""
+def bitmap_cubes(cuboids: list[Cuboid], lo: int = MIN_XYZ, hi: int = MAX_XYZ) -> np.ndarray:
+    """Run the given cuboids, in order, and return a boolean array of the
+    primitive cubes from lo to hi on each axis, indexed by (x-lo, y-lo, z-lo),
+    that are activated, at the end.  Each cuboid is clipped to the region
+    and applied as one slice assignment.
+    """
+    reactor = np.zeros((hi - lo + 1,) * 3, dtype=bool)
+    for cuboid in cuboids:
+        x0, x1 = max(cuboid.xmin, lo), min(cuboid.xmax, hi)
+        y0, y1 = max(cuboid.ymin, lo), min(cuboid.ymax, hi)
+        z0, z1 = max(cuboid.zmin, lo), min(cuboid.zmax, hi)
+        if x0 > x1 or y0 > y1 or z0 > z1:
+            continue
+        reactor[x0-lo:x1-lo+1, y0-lo:y1-lo+1, z0-lo:z1-lo+1] = cuboid.on
+    return reactor
+
+def solve(lines: Lines, lo: int = MIN_XYZ, hi: int = MAX_XYZ) -> int:
+    """Solve the problem, for the initialization region from lo to hi on each axis."""
     cuboids = parse_input(lines)
-    reactor = add_cuboids(cuboids)
-    return len(reactor)
+    reactor = bitmap_cubes(cuboids, lo, hi)
+    return int(reactor.sum())
 
 
 # PART 1
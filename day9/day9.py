@@ -6,7 +6,9 @@ from typing import Sequence, Any
 from pathlib import Path
 from collections import defaultdict
 import math
+import numpy as np
 from location import Location, Delta
+from digitgrid import load_digit_grid, ZERO
 
 INPUTFILE = "input.txt"
 
@@ -87,6 +89,25 @@ def low_points(heights) -> list[Location]:
         result.append(loc)
     return result
 
+def low_point_mask(heights: np.ndarray) -> np.ndarray:
+    """Return a boolean array marking the low points of a heightmap array.
+    Only the order of the heights matters, so they may be ASCII digits.
+    """
+    padded = np.pad(heights, 1, constant_values=np.iinfo(heights.dtype).max)
+    centre = padded[1:-1, 1:-1]
+    return (
+        (centre < padded[:-2, 1:-1]) & (centre < padded[2:, 1:-1]) &
+        (centre < padded[1:-1, :-2]) & (centre < padded[1:-1, 2:])
+    )
+
+def solve_file(path: str) -> int:
+    """Solve the problem for the heightmap in the given file, loaded with
+    load_digit_grid() rather than parsed line by line.
+    """
+    chars = load_digit_grid(path).chars
+    low_chars = chars[low_point_mask(chars)].astype(np.int64)
+    return int((low_chars - ZERO + 1).sum())
+
 def solve2(lines: Lines) -> int:
     """Solve the problem."""
     heights = parse_input(lines)